@@ -1,6 +1,24 @@
 """Claude Code Decision Telegram Bot."""
 
-from claude_code_telegram.config import Config
-from claude_code_telegram.hook_handler import PermissionRequest, create_hook_response
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from claude_code_telegram.config import Config
+    from claude_code_telegram.hook_handler import PermissionRequest, create_hook_response
 
 __all__ = ["Config", "PermissionRequest", "create_hook_response"]
+
+# Public names are imported on first access, so that hook subprocesses only
+# load the modules (and the telegram library) they actually use.
+_LAZY_ATTRS = {
+    "Config": "claude_code_telegram.config",
+    "PermissionRequest": "claude_code_telegram.hook_handler",
+    "create_hook_response": "claude_code_telegram.hook_handler",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_ATTRS:
+        return getattr(importlib.import_module(_LAZY_ATTRS[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
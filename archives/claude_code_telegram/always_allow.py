@@ -1,65 +1,128 @@
 """Always Allow Manager for persistent tool preferences."""
 
-import json
+import asyncio
+import os
+import threading
 from pathlib import Path
 from typing import cast
 
+from claude_code_telegram import json_compat
+
+# Parsed tool sets by storage path, keyed on the file's (st_mtime_ns, st_size)
+# so that managers created later in the same process skip re-reading the file
+_CACHE: dict[Path, tuple[tuple[int, int], frozenset[str]]] = {}
+
+# Serializes read-modify-write cycles, which add_tool_async runs on worker threads
+_WRITE_LOCK = threading.Lock()
+
 
 class AlwaysAllowManager:
-    """Manages always-allow preferences for tools."""
+    """Manages always-allow preferences for tools.
 
+    The tool list is loaded once and kept in memory as a set for lookups;
+    changes start from the current file contents, so tools added by other
+    managers or the Rust hook are kept, and are written back immediately.
+    """
+
+    # Same file and {"tools": [...]} schema as the Rust hook, so both can share it.
+    # Lookups never touch the file, so a JSON rewrite on the rare add is cheap.
     DEFAULT_PATH = Path.home() / ".claude" / "always_allow.json"
 
     def __init__(self, storage_path: Path | None = None) -> None:
         self.storage_path = storage_path or self.DEFAULT_PATH
-        self._ensure_storage_exists()
+        # The storage file is created on the first write, not here
+        self._tools: set[str] = set(self._load())
+
+    def _load(self) -> frozenset[str]:
+        """Load the tool set, reusing the cached copy while the file is unchanged."""
+        try:
+            st = self.storage_path.stat()
+        except FileNotFoundError:
+            return frozenset()
 
-    def _ensure_storage_exists(self) -> None:
-        """Ensure the storage directory and file exist."""
-        self.storage_path.parent.mkdir(parents=True, exist_ok=True)
-        if not self.storage_path.exists():
-            self._write_data({"tools": []})
+        version = (st.st_mtime_ns, st.st_size)
+        cached = _CACHE.get(self.storage_path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        tools = frozenset(self._read_data()["tools"])
+        _CACHE[self.storage_path] = (version, tools)
+        return tools
 
     def _read_data(self) -> dict[str, list[str]]:
         """Read data from storage file."""
         try:
-            with open(self.storage_path) as f:
-                data = json.load(f)
+            with open(self.storage_path, "rb") as f:
+                data = json_compat.loads(f.read())
                 if "tools" not in data:
                     data["tools"] = []
                 return cast(dict[str, list[str]], data)
-        except (json.JSONDecodeError, FileNotFoundError):
+        except (json_compat.JSONDecodeError, FileNotFoundError):
             return {"tools": []}
 
-    def _write_data(self, data: dict[str, list[str]]) -> None:
-        """Write data to storage file."""
-        with open(self.storage_path, "w") as f:
-            json.dump(data, f, indent=2)
+    def _write_data(self, data: dict[str, list[str]]) -> tuple[int, int]:
+        """Write data to storage file atomically via a temporary file.
+
+        Returns the (st_mtime_ns, st_size) of what was written, taken before the
+        replace so a write by another process right after can't be mistaken for it.
+        """
+        # Unique per call, as writers in other processes and threads may overlap
+        unique = f"{os.getpid()}.{os.urandom(4).hex()}"
+        tmp_path = self.storage_path.with_suffix(f"{self.storage_path.suffix}.{unique}.tmp")
+        content = json_compat.dumps(data, indent=True)
+        try:
+            tmp_path.write_bytes(content)
+        except FileNotFoundError:
+            self.storage_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_bytes(content)
+        # Renaming keeps the mtime and size, so these match the storage file
+        st = tmp_path.stat()
+        os.replace(tmp_path, self.storage_path)
+        return st.st_mtime_ns, st.st_size
+
+    def _flush(self) -> None:
+        """Persist the in-memory tool set, sorted so the file stays stable."""
+        version = self._write_data({"tools": sorted(self._tools)})
+        _CACHE[self.storage_path] = (version, frozenset(self._tools))
 
     def is_allowed(self, tool_name: str) -> bool:
         """Check if a tool is in the always-allow list."""
-        data = self._read_data()
-        return tool_name in data["tools"]
+        return tool_name in self._tools
+
+    def _reload(self) -> None:
+        """Refresh the in-memory tool set from the storage file before a change."""
+        self._tools = set(self._load())
 
     def add_tool(self, tool_name: str) -> None:
         """Add a tool to the always-allow list."""
-        data = self._read_data()
-        if tool_name not in data["tools"]:
-            data["tools"].append(tool_name)
-            self._write_data(data)
+        with _WRITE_LOCK:
+            self._reload()
+            if tool_name not in self._tools:
+                self._tools.add(tool_name)
+                self._flush()
+
+    async def add_tool_async(self, tool_name: str) -> None:
+        """Add a tool without blocking the event loop on the file write."""
+        # Only a write does I/O, so known tools stay on the loop
+        if tool_name not in self._tools:
+            await asyncio.to_thread(self.add_tool, tool_name)
 
     def remove_tool(self, tool_name: str) -> None:
         """Remove a tool from the always-allow list."""
-        data = self._read_data()
-        if tool_name in data["tools"]:
-            data["tools"].remove(tool_name)
-            self._write_data(data)
+        with _WRITE_LOCK:
+            self._reload()
+            if tool_name in self._tools:
+                self._tools.remove(tool_name)
+                self._flush()
 
     def get_allowed_tools(self) -> list[str]:
         """Get the list of always-allowed tools."""
-        data = self._read_data()
-        return data["tools"]
+        return sorted(self._tools)
 
     def clear(self) -> None:
         """Clear all always-allow preferences."""
-        self._write_data({"tools": []})
+        with _WRITE_LOCK:
+            self._reload()
+            if self._tools:
+                self._tools.clear()
+                self._flush()
@@ -5,17 +5,20 @@ This is a standalone bot that can run continuously and handle
 permission requests from the hook handler.
 """
 
+import importlib.util
 import logging
-from typing import Any
+from typing import Any, Literal
 
 from telegram import Update
 from telegram.ext import (
+    AIORateLimiter,
     Application,
     CommandHandler,
     ContextTypes,
 )
 
 from claude_code_telegram.config import Config
+from claude_code_telegram.hook_client import daemon_running
 
 logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
@@ -23,6 +26,15 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Only message updates carry the commands this bot handles
+ALLOWED_UPDATES = [Update.MESSAGE]
+# Long-poll timeout in seconds; Telegram holds getUpdates open this long when idle
+POLLING_TIMEOUT = 50
+# HTTP/2 needs the optional h2 package (python-telegram-bot[http2])
+HTTP_VERSION: Literal["1.1", "2"] = "2" if importlib.util.find_spec("h2") is not None else "1.1"
+# AIORateLimiter needs the optional aiolimiter package (python-telegram-bot[rate-limiter])
+RATE_LIMITER_AVAILABLE = importlib.util.find_spec("aiolimiter") is not None
+
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle the /start command."""
@@ -68,7 +80,27 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
 def create_bot(config: Config) -> Application[Any, Any, Any, Any, Any, Any]:
     """Create and configure the Telegram bot application."""
-    app = Application.builder().token(config.telegram_bot_token).build()
+    builder = (
+        Application.builder()
+        .token(config.telegram_bot_token)
+        .connection_pool_size(config.connection_pool_size)
+        .pool_timeout(10.0)
+        .http_version(HTTP_VERSION)
+        .get_updates_connection_pool_size(config.get_updates_connection_pool_size)
+        .get_updates_pool_timeout(60.0)
+    )
+    app: Application[Any, Any, Any, Any, Any, Any]
+    if RATE_LIMITER_AVAILABLE:
+        # Stay within Telegram's limits of 30 msg/s overall and 20 msg/min per group
+        rate_limiter = AIORateLimiter(
+            overall_max_rate=30,
+            overall_time_period=1,
+            group_max_rate=20,
+            group_time_period=60,
+        )
+        app = builder.rate_limiter(rate_limiter).build()
+    else:
+        app = builder.build()
 
     app.add_handler(CommandHandler("start", start_command))
     app.add_handler(CommandHandler("help", help_command))
@@ -79,11 +111,34 @@ def create_bot(config: Config) -> Application[Any, Any, Any, Any, Any, Any]:
 
 def main() -> None:
     """Run the bot."""
-    config = Config.from_env()
+    config = Config.load()
     app = create_bot(config)
 
-    logger.info("Starting bot...")
-    app.run_polling(allowed_updates=Update.ALL_TYPES)
+    if config.webhook_url:
+        # Hooks poll getUpdates on the same token, which a webhook blocks
+        if daemon_running():
+            raise SystemExit(
+                "A permission hook is polling this bot token; stop it or use polling mode"
+            )
+        logger.warning(
+            "Webhook mode: permission hooks on this bot token can't receive button "
+            "presses while the webhook is set, and refuse to run until it is removed"
+        )
+        logger.info("Starting bot in webhook mode on port %d...", config.webhook_port)
+        app.run_webhook(
+            listen="0.0.0.0",
+            port=config.webhook_port,
+            webhook_url=config.webhook_url,
+            secret_token=config.webhook_secret_token,
+            allowed_updates=ALLOWED_UPDATES,
+        )
+    else:
+        logger.info("Starting bot...")
+        app.run_polling(
+            allowed_updates=ALLOWED_UPDATES,
+            timeout=POLLING_TIMEOUT,
+            poll_interval=0.0,
+        )
 
 
 if __name__ == "__main__":
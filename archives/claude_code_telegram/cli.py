@@ -4,53 +4,61 @@
 Provides subcommands for different hook handlers and the bot.
 """
 
-import argparse
+import importlib
 import sys
+from typing import TYPE_CHECKING
 
+if TYPE_CHECKING:
+    import argparse
+
+# Subcommand -> (module providing main(), help text)
+COMMANDS: dict[str, tuple[str, str]] = {
+    "hook": (
+        "claude_code_telegram.hook_client",
+        "Handle PermissionRequest hooks (reads from stdin)",
+    ),
+    "daemon": (
+        "claude_code_telegram.daemon",
+        "Run the hook daemon (started automatically by the hook)",
+    ),
+    "stop": (
+        "claude_code_telegram.stop_handler",
+        "Handle Stop hooks for job completion notifications (reads from stdin)",
+    ),
+    "bot": (
+        "claude_code_telegram.bot",
+        "Run the Telegram bot for /start and /help commands",
+    ),
+}
+
+
+def build_parser() -> "argparse.ArgumentParser":
+    """Build the argument parser, used only for help and usage errors."""
+    import argparse
 
-def main() -> None:
-    """Main CLI entry point with subcommands."""
     parser = argparse.ArgumentParser(
         prog="claude-code-telegram",
         description="Claude Code hook & Telegram Bot integration",
     )
     subparsers = parser.add_subparsers(dest="command", help="Available commands")
+    for name, (_, help_text) in COMMANDS.items():
+        subparsers.add_parser(name, help=help_text)
+    return parser
 
-    # Hook subcommand (PermissionRequest)
-    subparsers.add_parser(
-        "hook",
-        help="Handle PermissionRequest hooks (reads from stdin)",
-    )
-
-    # Stop subcommand
-    subparsers.add_parser(
-        "stop",
-        help="Handle Stop hooks for job completion notifications (reads from stdin)",
-    )
 
-    # Bot subcommand
-    subparsers.add_parser(
-        "bot",
-        help="Run the Telegram bot for /start and /help commands",
-    )
-
-    args = parser.parse_args()
-
-    if args.command == "hook":
-        from claude_code_telegram.hook_handler import main as hook_main
-
-        hook_main()
-    elif args.command == "stop":
-        from claude_code_telegram.stop_handler import main as stop_main
-
-        stop_main()
-    elif args.command == "bot":
-        from claude_code_telegram.bot import main as bot_main
+def main() -> None:
+    """Main CLI entry point with subcommands."""
+    # Hooks run on every tool call, so a plain subcommand skips argparse entirely
+    if len(sys.argv) == 2 and sys.argv[1] in COMMANDS:
+        module_name, _ = COMMANDS[sys.argv[1]]
+        importlib.import_module(module_name).main()
+        return
 
-        bot_main()
-    else:
-        parser.print_help()
-        sys.exit(1)
+    # Help, unknown commands and extra arguments are handled by argparse
+    parser = build_parser()
+    parser.parse_args()
+    parser.print_help()
+    sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -1,16 +1,74 @@
 """Configuration management for the Telegram bot."""
 
-import json
+import functools
 import os
 import socket
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Any
 
-from dotenv import load_dotenv
+from claude_code_telegram import json_compat
 
 DEFAULT_CONFIG_PATH = Path.home() / ".claude" / "telegram_hook.json"
 
 
+@functools.cache
+def get_hostname() -> str:
+    """Get the hostname of this machine, looked up once per process."""
+    return socket.gethostname()
+
+
+# Optional settings and their types. Each is read from the JSON key of the
+# same name, or from the TELEGRAM_<NAME> environment variable.
+_OPTIONAL_FIELDS: dict[str, type] = {
+    "webhook_url": str,
+    "webhook_port": int,
+    "webhook_secret_token": str,
+    "connection_pool_size": int,
+    "get_updates_connection_pool_size": int,
+}
+
+
+def _parse_optional_fields(values: dict[str, Any], source: object) -> dict[str, Any]:
+    """Convert the optional settings present in values to their field types."""
+    fields: dict[str, Any] = {}
+    for name, kind in _OPTIONAL_FIELDS.items():
+        value = values.get(name)
+        if value is None or value == "":
+            continue
+        try:
+            fields[name] = kind(value)
+        except ValueError:
+            raise ValueError(f"{name} must be of type {kind.__name__} in {source}") from None
+    return fields
+
+
+@functools.lru_cache(maxsize=4)
+def _read_json_config(path: Path, mtime_ns: int) -> dict[str, Any]:
+    """Read and validate the configuration fields from a JSON config file.
+
+    Results are cached per path and modification time, so repeated loads
+    of an unchanged file don't touch the disk again.
+    """
+    with open(path, "rb") as f:
+        data = json_compat.loads(f.read())
+
+    token = data.get("telegram_bot_token")
+    chat_id = data.get("telegram_chat_id")
+
+    if not token:
+        raise ValueError(f"telegram_bot_token is required in {path}")
+    if not chat_id:
+        raise ValueError(f"telegram_chat_id is required in {path}")
+
+    return {
+        "telegram_bot_token": token,
+        # Ensure chat_id is a string
+        "telegram_chat_id": str(chat_id),
+        **_parse_optional_fields(data, path),
+    }
+
+
 @dataclass
 class Config:
     """Application configuration."""
@@ -18,6 +76,13 @@ class Config:
     telegram_bot_token: str
     telegram_chat_id: str
     hostname: str
+    # Run the bot in webhook mode when set, otherwise it uses long polling
+    webhook_url: str | None = None
+    webhook_port: int = 8443
+    webhook_secret_token: str | None = None
+    # HTTP connection pools for outgoing API calls and for getUpdates polling
+    connection_pool_size: int = 32
+    get_updates_connection_pool_size: int = 4
 
     @classmethod
     def from_json(cls, config_path: Path | None = None) -> "Config":
@@ -28,35 +93,36 @@ class Config:
             "telegram_bot_token": "your_bot_token",
             "telegram_chat_id": "your_chat_id"
         }
+
+        Optional keys: webhook_url, webhook_port, webhook_secret_token,
+        connection_pool_size, get_updates_connection_pool_size.
         """
         path = config_path or DEFAULT_CONFIG_PATH
 
-        if not path.exists():
-            raise FileNotFoundError(f"Configuration file not found: {path}")
-
-        with open(path) as f:
-            data = json.load(f)
+        try:
+            mtime_ns = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Configuration file not found: {path}") from None
 
-        token = data.get("telegram_bot_token")
-        chat_id = data.get("telegram_chat_id")
-
-        if not token:
-            raise ValueError(f"telegram_bot_token is required in {path}")
-        if not chat_id:
-            raise ValueError(f"telegram_chat_id is required in {path}")
-
-        # Ensure chat_id is a string
-        chat_id = str(chat_id)
+        return cls._from_json_file(path, mtime_ns)
 
-        return cls(
-            telegram_bot_token=token,
-            telegram_chat_id=chat_id,
-            hostname=socket.gethostname(),
-        )
+    @classmethod
+    def _from_json_file(cls, path: Path, mtime_ns: int) -> "Config":
+        """Build configuration from a JSON file whose mtime is already known."""
+        return cls(hostname=get_hostname(), **_read_json_config(path, mtime_ns))
 
     @classmethod
     def from_env(cls) -> "Config":
-        """Load configuration from environment variables."""
+        """Load configuration from environment variables.
+
+        Optional settings are read from TELEGRAM_WEBHOOK_URL,
+        TELEGRAM_WEBHOOK_PORT, TELEGRAM_WEBHOOK_SECRET_TOKEN,
+        TELEGRAM_CONNECTION_POOL_SIZE and
+        TELEGRAM_GET_UPDATES_CONNECTION_POOL_SIZE.
+        """
+        # Only needed when there is no JSON config, so imported lazily
+        from dotenv import load_dotenv
+
         load_dotenv()
 
         token = os.getenv("TELEGRAM_BOT_TOKEN")
@@ -67,10 +133,13 @@ class Config:
         if not chat_id:
             raise ValueError("TELEGRAM_CHAT_ID environment variable is required")
 
+        optional = {name: os.getenv(f"TELEGRAM_{name.upper()}") for name in _OPTIONAL_FIELDS}
+
         return cls(
             telegram_bot_token=token,
             telegram_chat_id=chat_id,
-            hostname=socket.gethostname(),
+            hostname=get_hostname(),
+            **_parse_optional_fields(optional, "environment"),
         )
 
     @classmethod
@@ -84,11 +153,13 @@ class Config:
         """
         # Try JSON file first
         path = config_path or DEFAULT_CONFIG_PATH
-        if path.exists():
-            return cls.from_json(path)
+        try:
+            mtime_ns = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            # Fall back to environment variables
+            return cls.from_env()
 
-        # Fall back to environment variables
-        return cls.from_env()
+        return cls._from_json_file(path, mtime_ns)
 
 
 def get_project_root() -> Path:
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Long-lived daemon answering PermissionRequest hooks over a unix socket.
+
+Keeps the Telegram application, its long-poll and the pending decisions
+alive between tool calls, so each hook only pays for a socket round-trip.
+Started on demand by hook_client and exits once idle.
+"""
+
+import asyncio
+import fcntl
+import logging
+from pathlib import Path
+
+from claude_code_telegram import hook_handler
+from claude_code_telegram.hook_client import LOCK_PATH, SOCKET_PATH
+
+logger = logging.getLogger(__name__)
+
+# Seconds without connections before exiting; longer than DECISION_TIMEOUT
+IDLE_TIMEOUT = 600
+
+
+class HookDaemon:
+    """Unix socket server handling one hook input per connection."""
+
+    def __init__(self, socket_path: Path = SOCKET_PATH, idle_timeout: float = IDLE_TIMEOUT):
+        self.socket_path = socket_path
+        self.idle_timeout = idle_timeout
+        self._active = 0
+        self._idle_timer: asyncio.TimerHandle | None = None
+        self._stopped = asyncio.Event()
+        # Set while no connection is active
+        self._drained = asyncio.Event()
+        self._drained.set()
+
+    def _start_idle_timer(self) -> None:
+        """Stop the daemon after idle_timeout unless a connection arrives first."""
+        loop = asyncio.get_running_loop()
+        self._idle_timer = loop.call_later(self.idle_timeout, self._stopped.set)
+
+    def _protocol(self) -> asyncio.StreamReaderProtocol:
+        """Create the protocol for an accepted connection, counting it as active.
+
+        Counted at accept rather than in the handler, whose task starts a few
+        loop iterations later, so shutdown can't happen in between.
+        """
+        self._active += 1
+        self._drained.clear()
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+        return asyncio.StreamReaderProtocol(asyncio.StreamReader(), self._handle_connection)
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Read hook input until EOF, then write the response and close."""
+        try:
+            data = await reader.read()
+            writer.write(await hook_handler.handle_hook_input(data))
+            await writer.drain()
+        except Exception:
+            # Closing without a response makes the client fail the hook
+            logger.exception("Error handling hook input")
+        finally:
+            writer.close()
+            self._active -= 1
+            if not self._active:
+                self._drained.set()
+                if not self._stopped.is_set():
+                    self._start_idle_timer()
+
+    async def serve(self) -> None:
+        """Serve hooks until idle for idle_timeout seconds."""
+        # Only reached while holding the lock, so an existing socket is stale
+        self.socket_path.unlink(missing_ok=True)
+        loop = asyncio.get_running_loop()
+        server = await loop.create_unix_server(self._protocol, path=str(self.socket_path))
+        self.socket_path.chmod(0o600)
+        self._start_idle_timer()
+        logger.info("Listening on %s", self.socket_path)
+
+        try:
+            async with server:
+                await self._stopped.wait()
+                # Stop accepting first, then let already accepted connections finish
+                # before the Application they use is shut down
+                server.close()
+                await self._drained.wait()
+        finally:
+            self.socket_path.unlink(missing_ok=True)
+            await hook_handler.shutdown()
+        logger.info("Idle for %ss, exiting", self.idle_timeout)
+
+
+def main() -> None:
+    """Run the daemon unless another instance is already serving."""
+    logging.basicConfig(
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        level=logging.INFO,
+    )
+    LOCK_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(LOCK_PATH, "w") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            # Another daemon is serving, or a hook is being handled in-process
+            return
+        asyncio.run(HookDaemon().serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""Thin PermissionRequest hook that forwards to the hook daemon.
+
+Claude Code runs the hook once per tool call, so this module imports neither
+telegram nor the config machinery. The daemon is started on first use; if
+no daemon comes up the hook is handled in this process instead.
+"""
+
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import IO
+
+SOCKET_PATH = Path.home() / ".claude" / "claude-code-telegram.sock"
+LOCK_PATH = SOCKET_PATH.with_suffix(".lock")
+LOG_PATH = SOCKET_PATH.with_suffix(".log")
+
+# How long to wait for a spawned daemon before handling the hook in-process
+SPAWN_TIMEOUT = 5.0
+# How long to wait for a daemon that holds the lock but isn't listening yet
+STARTUP_TIMEOUT = 30.0
+SPAWN_POLL_INTERVAL = 0.05
+RECV_SIZE = 64 * 1024
+
+# Shared daemon lock held while handling a hook in-process, until exit
+_fallback_lock: IO[str] | None = None
+
+# Run under -I, so neither the working directory nor PYTHON* variables decide
+# what the daemon imports; the package's location is passed as the first argument
+_DAEMON_BOOTSTRAP = (
+    "import sys; sys.path.insert(0, sys.argv.pop(1)); "
+    "from claude_code_telegram.cli import main; main()"
+)
+
+
+def _connect() -> socket.socket | None:
+    """Connect to the daemon socket, or return None if nothing is listening."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(SOCKET_PATH))
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def _daemon_command() -> list[str]:
+    """Get the command that runs the daemon from this installation."""
+    # Set by pex, whose dependencies are only importable through the PEX file
+    pex = os.environ.get("PEX")
+    if pex:
+        return [sys.executable, pex, "daemon"]
+    package_root = str(Path(__file__).resolve().parent.parent)
+    return [sys.executable, "-I", "-c", _DAEMON_BOOTSTRAP, package_root, "daemon"]
+
+
+def _take_fallback_lock() -> bool:
+    """Share the daemon lock unless a daemon holds it, keeping it until exit.
+
+    While held, a late daemon can't start and poll for updates next to the
+    in-process fallback.
+    """
+    global _fallback_lock
+    import fcntl
+
+    lock_file = open(LOCK_PATH, "a")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_SH | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return False
+    _fallback_lock = lock_file
+    return True
+
+
+def daemon_running() -> bool:
+    """Check whether a hook daemon, or an in-process fallback, holds the lock."""
+    import fcntl
+
+    try:
+        lock_file = open(LOCK_PATH)
+    except FileNotFoundError:
+        return False
+    with lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+    return False
+
+
+def _spawn_daemon() -> None:
+    """Start the daemon in its own session, running the same code as this process."""
+    SOCKET_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(LOG_PATH, "ab") as log:
+        # The daemon outlives the session that started it, so it must not run
+        # in (or import from) the project directory Claude Code is working in
+        subprocess.Popen(
+            _daemon_command(),
+            cwd=SOCKET_PATH.parent,
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=log,
+            start_new_session=True,
+        )
+
+
+def connect_or_spawn() -> socket.socket | None:
+    """Connect to the daemon, starting it if needed.
+
+    Returns None if no daemon came up within SPAWN_TIMEOUT, with the daemon
+    lock taken so the caller can handle the hook itself. Raises TimeoutError
+    if a daemon holds the lock but doesn't listen within STARTUP_TIMEOUT.
+    """
+    sock = _connect()
+    if sock is not None:
+        return sock
+
+    _spawn_daemon()
+    start = time.monotonic()
+    while True:
+        time.sleep(SPAWN_POLL_INTERVAL)
+        sock = _connect()
+        if sock is not None:
+            return sock
+        elapsed = time.monotonic() - start
+        if elapsed >= SPAWN_TIMEOUT and _take_fallback_lock():
+            return None
+        if elapsed >= STARTUP_TIMEOUT:
+            raise TimeoutError(f"Hook daemon isn't accepting connections, see {LOG_PATH}")
+
+
+def forward(sock: socket.socket, data: bytes) -> bytes:
+    """Send hook input to the daemon and return its complete response."""
+    with sock:
+        sock.sendall(data)
+        # EOF marks the end of the request, the daemon closing marks the response's
+        sock.shutdown(socket.SHUT_WR)
+        chunks = []
+        while chunk := sock.recv(RECV_SIZE):
+            chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def _handle_in_process(data: bytes) -> None:
+    """Handle the hook in this process, writing its output to stdout."""
+    import asyncio
+
+    from claude_code_telegram import hook_handler
+
+    asyncio.run(hook_handler.async_main(data))
+
+
+def main() -> None:
+    """Main entry point for the PermissionRequest hook."""
+    data = sys.stdin.buffer.read()
+
+    try:
+        sock = connect_or_spawn() if hasattr(socket, "AF_UNIX") else None
+    except TimeoutError as e:
+        sys.exit(str(e))
+    if sock is None:
+        _handle_in_process(data)
+        return
+
+    try:
+        response = forward(sock, data)
+    except ConnectionError:
+        # Queued as an exiting daemon stopped accepting; try the next daemon once
+        try:
+            sock = connect_or_spawn()
+        except TimeoutError as e:
+            sys.exit(str(e))
+        if sock is None:
+            _handle_in_process(data)
+            return
+        response = forward(sock, data)
+    if not response:
+        sys.exit(f"Hook daemon returned no decision, see {LOG_PATH}")
+
+    sys.stdout.buffer.write(response)
+    sys.stdout.buffer.flush()
+
+
+if __name__ == "__main__":
+    main()
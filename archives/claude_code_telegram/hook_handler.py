@@ -6,18 +6,102 @@ by sending them to a Telegram bot and waiting for user decisions.
 """
 
 import asyncio
-import json
+import hashlib
+import html
+import os
+import re
 import sys
-import uuid
 from dataclasses import dataclass
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import Application, CallbackQueryHandler, ContextTypes
+from telegram import Bot, InlineKeyboardButton, InlineKeyboardMarkup, Update
 
+from claude_code_telegram import json_compat
 from claude_code_telegram.always_allow import AlwaysAllowManager
 from claude_code_telegram.config import Config
 
+if TYPE_CHECKING:
+    from telegram.ext import Application, ContextTypes
+
+# Maximum length of the tool input preview in messages
+INPUT_PREVIEW_CHARS = 500
+# Telegram rejects messages over 4096 UTF-16 code units; the rest is left for the status line
+MESSAGE_MAX_UNITS = 4000
+# Maximum length of file paths in messages, in UTF-16 code units
+PATH_MAX_UNITS = 300
+# Replaces the middle of values that don't fit in a message
+ELISION = "\n… <truncated> …\n"
+
+
+def _utf16_len(text: str) -> int:
+    """Get the length of text as Telegram counts it, in UTF-16 code units."""
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _elide_middle(text: str, limit: int) -> str:
+    """Cut text to at most limit UTF-16 code units by replacing its middle with ELISION."""
+    units = _utf16_len(text)
+    if units <= limit:
+        return text
+    # Characters outside the BMP take two code units, so this may take a few rounds
+    keep = max((limit - _utf16_len(ELISION)) * len(text) // units, 0)
+    while True:
+        head = keep // 2
+        elided = text[:head] + ELISION + text[len(text) - keep + head :]
+        excess = _utf16_len(elided) - limit
+        if excess <= 0 or keep == 0:
+            return elided
+        keep = max(keep - excess, 0)
+
+
+def _clip(obj: Any, budget: int) -> tuple[Any, int]:
+    """Copy obj, keeping only what can appear in the first budget chars of its JSON.
+
+    Returns the clipped copy and the remaining budget. Budgets are charged at
+    the minimum rendered size of each value, so once the budget runs out the
+    JSON of the copy is at least as long as the original budget.
+    """
+    if isinstance(obj, str):
+        # A negative budget would slice from the end and keep nearly everything
+        return obj[: max(budget, 0)], budget - len(obj) - 2
+    if isinstance(obj, dict):
+        clipped: dict[str, Any] = {}
+        budget -= 2
+        for key, value in obj.items():
+            if budget <= 0:
+                break
+            budget -= len(str(key)) + 4
+            clipped[key], budget = _clip(value, budget)
+        return clipped, budget
+    if isinstance(obj, list):
+        items: list[Any] = []
+        budget -= 2
+        for value in obj:
+            if budget <= 0:
+                break
+            value, budget = _clip(value, budget - 1)
+            items.append(value)
+        return items, budget
+    return obj, budget - 1
+
+
+def _escape(value: Any) -> str:
+    """Escape a value for Telegram's HTML parse mode, which only needs <, > and &."""
+    return html.escape(str(value), quote=False)
+
+
+def _truncated_dumps(obj: Any, limit: int = INPUT_PREVIEW_CHARS) -> str:
+    """Serialize obj as indented JSON, cut to at most limit characters.
+
+    Only the part of obj that can show up within the limit is serialized, so
+    the cost doesn't grow with the size of obj.
+    """
+    clipped, _ = _clip(obj, limit)
+    text = json_compat.dumps(clipped, indent=True).decode()
+    if len(text) > limit:
+        return text[:limit] + "..."
+    return text
+
 
 @dataclass
 class PermissionRequest:
@@ -26,45 +110,174 @@ class PermissionRequest:
     tool_name: str
     tool_input: dict[str, Any]
     request_id: str
+    # Working directory of the Claude Code session that asked
+    cwd: str = ""
 
     @classmethod
     def from_hook_input(cls, data: dict[str, Any]) -> "PermissionRequest":
         """Parse permission request from Claude Code hook input."""
         tool_name = data.get("tool_name", "unknown")
         tool_input = data.get("tool_input", {})
-        request_id = str(uuid.uuid4())[:8]
-        return cls(tool_name=tool_name, tool_input=tool_input, request_id=request_id)
+        request_id = os.urandom(4).hex()
+        cwd = data.get("cwd", "")
+        return cls(tool_name=tool_name, tool_input=tool_input, request_id=request_id, cwd=cwd)
+
+    @property
+    def key(self) -> str:
+        """Identify the tool call, so identical requests share one decision.
+
+        Includes cwd, so the same call from another project gets its own prompt.
+        """
+        canonical = json_compat.dumps([self.cwd, self.tool_name, self.tool_input], sort_keys=True)
+        return hashlib.sha256(canonical).hexdigest()
+
+    @property
+    def project_name(self) -> str:
+        """Get the project name from the working directory."""
+        return _elide_middle(self.cwd.rstrip(os.sep).rpartition(os.sep)[2], PATH_MAX_UNITS)
 
     def format_message(self, hostname: str | None = None) -> str:
         """Format the permission request as a Telegram message."""
         lines = [
-            f"🔐 *Permission Request* `[{self.request_id}]`",
+            f"🔐 <b>Permission Request</b> <code>[{self.request_id}]</code>",
         ]
 
         if hostname:
-            lines.append(f"🖥️ *Host:* `{hostname}`")
+            lines.append(f"🖥️ <b>Host:</b> <code>{_escape(hostname)}</code>")
+        if self.cwd:
+            lines.append(f"📁 <b>Project:</b> <code>{_escape(self.project_name)}</code>")
 
         lines.extend([
             "",
-            f"*Tool:* `{self.tool_name}`",
+            f"<b>Tool:</b> <code>{_escape(self.tool_name)}</code>",
         ])
+        budget = MESSAGE_MAX_UNITS - _utf16_len("\n".join(lines)) - 1
+        lines.extend(self._body_lines(include_edit_diff=True, budget=budget))
+
+        return "\n".join(lines)
+
+    def _body_lines(self, include_edit_diff: bool, budget: int) -> list[str]:
+        """Format the tool-specific details of the request as message lines.
 
+        Budget is the message length left for these lines, in UTF-16 code
+        units. Values are cut before escaping so the markup stays balanced.
+        """
         if self.tool_name == "Bash":
-            command = self.tool_input.get("command", "")
-            lines.append(f"*Command:*\n```\n{command}\n```")
-        elif self.tool_name in ("Edit", "Write"):
-            file_path = self.tool_input.get("file_path", "")
-            lines.append(f"*File:* `{file_path}`")
-            if self.tool_name == "Edit":
+            command = str(self.tool_input.get("command", ""))
+            command = _elide_middle(command, budget - len("<b>Command:</b>\n<pre></pre>"))
+            return [f"<b>Command:</b>\n<pre>{_escape(command)}</pre>"]
+
+        if self.tool_name in ("Edit", "Write"):
+            file_path = _elide_middle(str(self.tool_input.get("file_path", "")), PATH_MAX_UNITS)
+            lines = [f"<b>File:</b> <code>{_escape(file_path)}</code>"]
+            if include_edit_diff and self.tool_name == "Edit":
                 old_string = self.tool_input.get("old_string", "")[:200]
                 new_string = self.tool_input.get("new_string", "")[:200]
-                lines.append(f"*Old:*\n```\n{old_string}\n```")
-                lines.append(f"*New:*\n```\n{new_string}\n```")
-        else:
-            input_str = json.dumps(self.tool_input, indent=2)[:500]
-            lines.append(f"*Input:*\n```json\n{input_str}\n```")
+                lines.append(f"<b>Old:</b>\n<pre>{_escape(old_string)}</pre>")
+                lines.append(f"<b>New:</b>\n<pre>{_escape(new_string)}</pre>")
+            return lines
+
+        input_str = _escape(_truncated_dumps(self.tool_input))
+        return [f'<b>Input:</b>\n<pre><code class="language-json">{input_str}</code></pre>']
+
+
+# Long-poll timeout in seconds; Telegram holds getUpdates open this long when idle
+POLLING_TIMEOUT = 50
+# Seconds to wait for a button press before denying the request
+DECISION_TIMEOUT = 300
+# Callback data is "<request_id>:<decision>[:<tool_name>]"
+CALLBACK_DATA_PATTERN = re.compile(r"^[0-9a-f]{8}:")
+
+# Process-wide Telegram clients, created on first use and reused by every
+# request handled in this process (one bot token per process)
+_bot: Bot | None = None
+_app: "Application[Any, Any, Any, Any, Any, Any] | None" = None
+_app_lock = asyncio.Lock()
+# Handlers waiting for a button press, keyed by request ID
+_PENDING: dict[str, "DecisionHandler"] = {}
+# Decisions being requested, keyed by PermissionRequest.key
+_INFLIGHT: dict[str, "asyncio.Task[str]"] = {}
+
+# Decision button labels
+_ALLOW_LABEL = "✅ Allow"
+_DENY_LABEL = "❌ Deny"
+_ALWAYS_LABEL = "🔓 Always Allow"
+
+
+def _build_keyboard(req_id: str, tool_name: str) -> InlineKeyboardMarkup:
+    """Build the decision buttons for a request; only the callback data varies."""
+    return InlineKeyboardMarkup((
+        (
+            InlineKeyboardButton(_ALLOW_LABEL, callback_data=f"{req_id}:allow"),
+            InlineKeyboardButton(_DENY_LABEL, callback_data=f"{req_id}:deny"),
+        ),
+        (InlineKeyboardButton(_ALWAYS_LABEL, callback_data=f"{req_id}:always_allow:{tool_name}"),),
+    ))
+
+
+def _get_bot(token: str) -> Bot:
+    """Get the shared Bot used for notifications that need no replies."""
+    global _bot
+    if _bot is None:
+        # API calls work without initialize(), which would cost a getMe round trip
+        _bot = Bot(token=token)
+    return _bot
+
+
+async def _get_application(token: str) -> "Application[Any, Any, Any, Any, Any, Any]":
+    """Get the shared Application, starting callback polling on first use."""
+    global _app
+    async with _app_lock:
+        if _app is None:
+            # Only interactive requests need telegram.ext, so it is imported here
+            from telegram.ext import Application, CallbackQueryHandler
+
+            app = Application.builder().token(token).build()
+            app.add_handler(
+                CallbackQueryHandler(_dispatch_callback, pattern=CALLBACK_DATA_PATTERN)
+            )
+            await app.initialize()
+            # Polling would delete the webhook of a bot running in webhook mode
+            # on the same token, and callback queries can't reach us while it is set
+            if (await app.bot.get_webhook_info()).url:
+                await app.shutdown()
+                raise RuntimeError(
+                    "A webhook is set for this bot token, so button presses can't "
+                    "reach the hook; run the bot in polling mode or use another token"
+                )
+            # Start polling to receive callback queries, the only updates we handle
+            await app.updater.start_polling(  # type: ignore[union-attr]
+                timeout=POLLING_TIMEOUT,
+                poll_interval=0,
+                allowed_updates=[Update.CALLBACK_QUERY],
+            )
+            await app.start()
+            _app = app
+    return _app
 
-        return "\n".join(lines)
+
+async def _dispatch_callback(update: Any, context: "ContextTypes.DEFAULT_TYPE") -> None:
+    """Route a button press to the handler waiting for its request ID."""
+    query = update.callback_query
+    await query.answer()
+
+    request_id, decision, *rest = query.data.split(":", 2)
+    handler = _PENDING.get(request_id)
+    if handler is not None:
+        await handler.handle_callback(query, decision, rest[0] if rest else None)
+
+
+async def shutdown() -> None:
+    """Stop polling and close the shared Telegram clients."""
+    global _bot, _app
+    if _app is not None:
+        await _app.updater.stop()  # type: ignore[union-attr]
+        await _app.stop()
+        await _app.shutdown()
+        _app = None
+    if _bot is not None:
+        await _bot.request.shutdown()
+        _bot = None
 
 
 class DecisionHandler:
@@ -75,36 +288,59 @@ class DecisionHandler:
     ) -> None:
         self.config = config
         self.always_allow_manager = always_allow_manager or AlwaysAllowManager()
+        # Text of the request message, reused when the decision is shown
+        self.message_text: str | None = None
         self.decision: str | None = None
         self.decision_event = asyncio.Event()
 
     async def send_auto_approved_notification(self, request: PermissionRequest) -> None:
         """Send a notification for auto-approved tool (no buttons)."""
-        app = Application.builder().token(self.config.telegram_bot_token).build()
-
         lines = [
-            f"⚙️ *Auto-Approved* `[{request.request_id}]`",
-            f"🖥️ *Host:* `{self.config.hostname}`",
+            f"⚙️ <b>Auto-Approved</b> <code>[{request.request_id}]</code>",
+            f"🖥️ <b>Host:</b> <code>{_escape(self.config.hostname)}</code>",
             "",
-            f"*Tool:* `{request.tool_name}` _(in always-allow list)_",
+            f"<b>Tool:</b> <code>{_escape(request.tool_name)}</code> <i>(in always-allow list)</i>",
         ]
-
-        if request.tool_name == "Bash":
-            command = request.tool_input.get("command", "")
-            lines.append(f"*Command:*\n```\n{command}\n```")
-        elif request.tool_name in ("Edit", "Write"):
-            file_path = request.tool_input.get("file_path", "")
-            lines.append(f"*File:* `{file_path}`")
+        budget = MESSAGE_MAX_UNITS - _utf16_len("\n".join(lines)) - 1
+        lines.extend(request._body_lines(include_edit_diff=False, budget=budget))
+
+        await _get_bot(self.config.telegram_bot_token).send_message(
+            chat_id=self.config.telegram_chat_id,
+            text="\n".join(lines),
+            parse_mode="HTML",
+        )
+
+    async def handle_callback(self, query: Any, decision: str, tool_name: str | None) -> None:
+        """Record the decision from a button press on this handler's request."""
+        if self.message_text is None:
+            return
+
+        # Handle "always_allow" decision
+        if decision == "always_allow" and tool_name:
+            await self.always_allow_manager.add_tool_async(tool_name)
+            self.decision = "allow"
+            status = f"🔓 Always Allowed (<code>{_escape(tool_name)}</code> added to list)"
+        elif decision == "allow":
+            self.decision = "allow"
+            status = "✅ Approved"
         else:
-            input_str = json.dumps(request.tool_input, indent=2)[:500]
-            lines.append(f"*Input:*\n```json\n{input_str}\n```")
-
-        async with app:
-            await app.bot.send_message(
-                chat_id=self.config.telegram_chat_id,
-                text="\n".join(lines),
-                parse_mode="Markdown",
-            )
+            self.decision = "deny"
+            status = "❌ Denied"
+
+        await query.edit_message_text(
+            text=f"{self.message_text}\n\n<b>Status:</b> {status}",
+            parse_mode="HTML",
+        )
+        self.decision_event.set()
+
+    async def _wait_for_decision(self) -> None:
+        """Wait for a button press, raising TimeoutError after DECISION_TIMEOUT."""
+        if sys.version_info >= (3, 11):
+            # Cheaper than wait_for, which wraps the wait in an extra Task
+            async with asyncio.timeout(DECISION_TIMEOUT):
+                await self.decision_event.wait()
+        else:
+            await asyncio.wait_for(self.decision_event.wait(), timeout=DECISION_TIMEOUT)
 
     async def send_request_and_wait(self, request: PermissionRequest) -> str:
         """Send permission request to Telegram and wait for decision."""
@@ -113,77 +349,25 @@ class DecisionHandler:
             await self.send_auto_approved_notification(request)
             return "allow"
 
-        app = Application.builder().token(self.config.telegram_bot_token).build()
-
-        async def handle_callback(
-            update: Any, context: ContextTypes.DEFAULT_TYPE
-        ) -> None:
-            query = update.callback_query
-            await query.answer()
-
-            callback_data = query.data
-            if callback_data.startswith(request.request_id):
-                parts = callback_data.split(":")
-                decision = parts[1]
-
-                # Handle "always_allow" decision
-                if decision == "always_allow" and len(parts) >= 3:
-                    tool_name = parts[2]
-                    self.always_allow_manager.add_tool(tool_name)
-                    self.decision = "allow"
-                    status = f"🔓 Always Allowed (`{tool_name}` added to list)"
-                elif decision == "allow":
-                    self.decision = "allow"
-                    status = "✅ Approved"
-                else:
-                    self.decision = "deny"
-                    status = "❌ Denied"
-
-                await query.edit_message_text(
-                    text=f"{request.format_message(self.config.hostname)}\n\n*Status:* {status}",
-                    parse_mode="Markdown",
-                )
-                self.decision_event.set()
-
-        app.add_handler(CallbackQueryHandler(handle_callback))
-
-        keyboard = [
-            [
-                InlineKeyboardButton(
-                    "✅ Allow", callback_data=f"{request.request_id}:allow"
-                ),
-                InlineKeyboardButton(
-                    "❌ Deny", callback_data=f"{request.request_id}:deny"
-                ),
-            ],
-            [
-                InlineKeyboardButton(
-                    "🔓 Always Allow",
-                    callback_data=f"{request.request_id}:always_allow:{request.tool_name}",
-                ),
-            ],
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        app = await _get_application(self.config.telegram_bot_token)
+        reply_markup = _build_keyboard(request.request_id, request.tool_name)
 
-        async with app:
+        self.message_text = request.format_message(self.config.hostname)
+        _PENDING[request.request_id] = self
+        try:
             await app.bot.send_message(
                 chat_id=self.config.telegram_chat_id,
-                text=request.format_message(self.config.hostname),
-                parse_mode="Markdown",
+                text=self.message_text,
+                parse_mode="HTML",
                 reply_markup=reply_markup,
             )
 
-            # Start polling to receive callback queries
-            await app.updater.start_polling()  # type: ignore[union-attr]
-            await app.start()
-
             try:
-                await asyncio.wait_for(self.decision_event.wait(), timeout=300)
+                await self._wait_for_decision()
             except asyncio.TimeoutError:
                 self.decision = "deny"
-
-            await app.updater.stop()  # type: ignore[union-attr]
-            await app.stop()
+        finally:
+            _PENDING.pop(request.request_id, None)
 
         return self.decision or "deny"
 
@@ -201,18 +385,60 @@ def create_hook_response(decision: str) -> dict[str, Any]:
     }
 
 
-async def async_main() -> None:
-    """Async main entry point for the hook handler."""
-    input_data = json.loads(sys.stdin.read())
+async def request_decision(config: Config, request: PermissionRequest) -> str:
+    """Get a decision for a request, sharing it with identical in-flight requests.
+
+    Only the first of several concurrent requests for the same tool call
+    prompts the user; the others wait for and return the same decision.
+    """
+    key = request.key
+    task = _INFLIGHT.get(key)
+    if task is None:
+        task = asyncio.ensure_future(DecisionHandler(config).send_request_and_wait(request))
+        _INFLIGHT[key] = task
+        task.add_done_callback(lambda _: _INFLIGHT.pop(key, None))
+    # Shielded so that a cancelled waiter doesn't cancel the prompt for the others
+    return await asyncio.shield(task)
+
+
+# Serialized create_hook_response() output for both behaviors, one line each
+_ALLOW_RESPONSE = (
+    b'{"hookSpecificOutput":{"hookEventName":"PermissionRequest",'
+    b'"decision":{"behavior":"allow"}}}\n'
+)
+_DENY_RESPONSE = (
+    b'{"hookSpecificOutput":{"hookEventName":"PermissionRequest",'
+    b'"decision":{"behavior":"deny"}}}\n'
+)
+
+
+def _response_bytes(decision: str) -> bytes:
+    """Get the serialized hook response line for a decision."""
+    return _ALLOW_RESPONSE if decision == "allow" else _DENY_RESPONSE
+
+
+async def handle_hook_input(data: bytes) -> bytes:
+    """Decide on serialized hook input and return the serialized hook response."""
+    input_data = json_compat.loads(data)
 
     config = Config.load()
     request = PermissionRequest.from_hook_input(input_data)
-    handler = DecisionHandler(config)
 
-    decision = await handler.send_request_and_wait(request)
-    response = create_hook_response(decision)
+    return _response_bytes(await request_decision(config, request))
+
+
+async def async_main(data: bytes | None = None) -> None:
+    """Handle one hook in this process, reading stdin unless data is given."""
+    if data is None:
+        data = sys.stdin.buffer.read()
+
+    try:
+        response = await handle_hook_input(data)
+    finally:
+        await shutdown()
 
-    print(json.dumps(response))
+    sys.stdout.buffer.write(response)
+    sys.stdout.buffer.flush()
 
 
 def main() -> None:
@@ -0,0 +1,37 @@
+"""JSON helpers that use orjson when it is installed.
+
+orjson is an optional dependency (``pip install .[fast]``); without it the
+standard library ``json`` module is used with the same interface.
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without the extra
+    orjson = None  # type: ignore[assignment]
+
+# orjson.JSONDecodeError is a subclass of json.JSONDecodeError
+JSONDecodeError = json.JSONDecodeError
+
+
+def loads(data: bytes | str) -> Any:
+    """Parse a JSON document from bytes or str."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any, *, indent: bool = False, sort_keys: bool = False) -> bytes:
+    """Serialize an object to UTF-8 encoded JSON.
+
+    indent selects 2-space indentation; sort_keys orders object keys, giving
+    a canonical form for equal objects.
+    """
+    if orjson is not None:
+        option = (orjson.OPT_INDENT_2 if indent else 0) | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        return orjson.dumps(obj, option=option or None)
+    if indent:
+        return json.dumps(obj, indent=2, ensure_ascii=False, sort_keys=sort_keys).encode()
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, sort_keys=sort_keys).encode()
@@ -6,16 +6,79 @@ It sends a notification to Telegram to alert the user.
 """
 
 import asyncio
-import json
+import html
+import importlib.util
+import os
 import sys
+from collections.abc import Iterator
 from dataclasses import dataclass
-from pathlib import Path
-from typing import Any
-
-from telegram import Bot
+from typing import IO, TYPE_CHECKING, Any
 
+from claude_code_telegram import json_compat
 from claude_code_telegram.config import Config
 
+if TYPE_CHECKING:
+    import httpx
+
+# Transcripts are read backwards in blocks of this size
+TAIL_BLOCK_SIZE = 64 * 1024
+# Bytes read from the start of a transcript to check that it is JSONL
+HEAD_PEEK_SIZE = 64
+
+# Maximum length of the assistant message summary in notifications
+SUMMARY_MAX_CHARS = 300
+
+TELEGRAM_API_URL = "https://api.telegram.org/bot{token}/{method}"
+
+# Notification header, formatted once per notifier
+NOTIFICATION_HEADER = "✅ <b>Job Completed</b>\n🖥️ <b>Host:</b> <code>{hostname}</code>\n"
+
+# Process-wide HTTP client, kept alive across notifications
+_client: "httpx.AsyncClient | None" = None
+
+
+def _get_client() -> "httpx.AsyncClient":
+    """Get the shared HTTP client, creating it on first use."""
+    global _client
+    if _client is None:
+        # Imported here so that no-op hook runs don't pay for it
+        import httpx
+
+        _client = httpx.AsyncClient(
+            # HTTP/2 needs the optional h2 package (httpx[http2])
+            http2=importlib.util.find_spec("h2") is not None,
+            limits=httpx.Limits(max_keepalive_connections=8),
+            timeout=httpx.Timeout(10.0),
+        )
+    return _client
+
+
+async def close_client() -> None:
+    """Close the shared HTTP client if it was created."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _iter_lines_reversed(f: IO[bytes], size: int) -> Iterator[bytes]:
+    """Yield the lines of a binary file from last to first."""
+    pos = size
+    # Pieces of the line currently being assembled, last piece first
+    pending: list[bytes] = []
+    while pos > 0:
+        read_size = min(TAIL_BLOCK_SIZE, pos)
+        pos -= read_size
+        f.seek(pos)
+        lines = f.read(read_size).split(b"\n")
+        pending.append(lines[-1])
+        if len(lines) == 1:
+            continue
+        yield b"".join(reversed(pending))
+        yield from reversed(lines[1:-1])
+        pending = [lines[0]]
+    yield b"".join(reversed(pending))
+
 
 @dataclass
 class StopEvent:
@@ -36,31 +99,40 @@ class StopEvent:
             stop_hook_active=data.get("stop_hook_active", False),
         )
 
-    def get_last_assistant_message(self) -> str | None:
-        """Extract the last assistant message from the transcript."""
-        if not self.transcript_path:
-            return None
+    @property
+    def project_name(self) -> str:
+        """Get the project name, i.e. the last component of cwd."""
+        return self.cwd.rstrip(os.sep).rpartition(os.sep)[2]
 
-        transcript_path = Path(self.transcript_path)
-        if not transcript_path.exists():
+    def get_last_assistant_message(self, max_chars: int | None = None) -> str | None:
+        """Extract the last assistant message from the transcript.
+
+        The transcript is scanned from the end, so only the trailing entries
+        are read and parsed. If max_chars is given, the message is cut to at
+        most that many characters.
+        """
+        if not self.transcript_path:
             return None
 
         try:
-            last_assistant_msg = None
-            with open(transcript_path) as f:
-                for line in f:
+            with open(self.transcript_path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                # Bail out early on empty files and anything that isn't JSONL
+                if not f.read(HEAD_PEEK_SIZE).lstrip().startswith(b"{"):
+                    return None
+                for line in _iter_lines_reversed(f, size):
                     try:
-                        entry = json.loads(line)
-                        if entry.get("type") == "assistant":
-                            message = entry.get("message", {})
-                            content = message.get("content", [])
-                            # Extract text from content blocks
-                            for block in content:
-                                if isinstance(block, dict) and block.get("type") == "text":
-                                    last_assistant_msg = block.get("text", "")
-                    except json.JSONDecodeError:
+                        entry = json_compat.loads(line)
+                    except json_compat.JSONDecodeError:
                         continue
-            return last_assistant_msg
+                    if not isinstance(entry, dict) or entry.get("type") != "assistant":
+                        continue
+                    content = entry.get("message", {}).get("content", [])
+                    # The last text block of the entry is the final answer
+                    for block in reversed(content):
+                        if isinstance(block, dict) and block.get("type") == "text":
+                            return str(block.get("text", ""))[:max_chars]
+            return None
         except Exception:
             return None
 
@@ -70,6 +142,12 @@ class StopNotifier:
 
     def __init__(self, config: Config) -> None:
         self.config = config
+        self._header = NOTIFICATION_HEADER.format(
+            hostname=html.escape(config.hostname, quote=False)
+        )
+        self._send_message_url = TELEGRAM_API_URL.format(
+            token=config.telegram_bot_token, method="sendMessage"
+        )
 
     async def send_notification(self, event: StopEvent) -> None:
         """Send job completion notification to Telegram."""
@@ -77,45 +155,54 @@ class StopNotifier:
         if event.stop_hook_active:
             return
 
-        bot = Bot(token=self.config.telegram_bot_token)
-
         # Get project name from cwd
-        project_name = Path(event.cwd).name if event.cwd else "Unknown"
+        project_name = event.project_name or "Unknown"
 
         # Try to get last assistant message for context
-        last_message = event.get_last_assistant_message()
+        # One extra character tells whether the message had to be truncated
+        last_message = event.get_last_assistant_message(max_chars=SUMMARY_MAX_CHARS + 1)
         summary = ""
         if last_message:
             # Truncate to reasonable length
-            truncated = last_message[:300]
-            if len(last_message) > 300:
+            truncated = last_message[:SUMMARY_MAX_CHARS]
+            if len(last_message) > SUMMARY_MAX_CHARS:
                 truncated += "..."
-            summary = f"\n\n*Summary:*\n{truncated}"
-
-        lines = [
-            "✅ *Job Completed*",
-            f"🖥️ *Host:* `{self.config.hostname}`",
-            f"📁 *Project:* `{project_name}`",
-            summary,
-        ]
-
-        async with bot:
-            await bot.send_message(
-                chat_id=self.config.telegram_chat_id,
-                text="\n".join(lines),
-                parse_mode="Markdown",
-            )
+            summary = f"\n\n<b>Summary:</b>\n{html.escape(truncated, quote=False)}"
+
+        project = f"📁 <b>Project:</b> <code>{html.escape(project_name, quote=False)}</code>"
+        await self._send_message(f"{self._header}{project}{summary}")
+
+    async def _send_message(self, text: str) -> None:
+        """Send an HTML message through the Bot API sendMessage method."""
+        body = json_compat.dumps({
+            "chat_id": self.config.telegram_chat_id,
+            "text": text,
+            "parse_mode": "HTML",
+        })
+        response = await _get_client().post(
+            self._send_message_url,
+            content=body,
+            headers={"Content-Type": "application/json"},
+        )
+        response.raise_for_status()
 
 
 async def async_main() -> None:
     """Async main entry point for the stop handler."""
-    input_data = json.loads(sys.stdin.read())
+    input_data = json_compat.loads(sys.stdin.read())
 
-    config = Config.load()
     event = StopEvent.from_hook_input(input_data)
+    # Continuations from a stop hook are no-ops; skip config and network setup
+    if event.stop_hook_active:
+        return
+
+    config = Config.load()
     notifier = StopNotifier(config)
 
-    await notifier.send_notification(event)
+    try:
+        await notifier.send_notification(event)
+    finally:
+        await close_client()
 
 
 def main() -> None:
@@ -45,11 +45,13 @@ echo "Building PEX with scie-jump..."
 cd "$PROJECT_ROOT"
 
 # Build the scie executable
+# --compile: Ship precompiled .pyc files so each hook run skips bytecode compilation
 # --scie: Create self-contained executable with Python runtime
 # --scie-python-version: Target Python version for the bundled interpreter
 # -c: Console script entry point
 # -o: Output file path
 pex . \
+    --compile \
     --scie "$SCIE_MODE" \
     --scie-python-version 3.11 \
     -c claude-code-telegram-hook \
@@ -1,106 +1,210 @@
 """Tests for always allow manager module."""
 
+import asyncio
 import json
-import tempfile
+import os
 from pathlib import Path
+from unittest.mock import patch
+
+import pytest
 
 from claude_code_telegram.always_allow import AlwaysAllowManager
 
 
+@pytest.fixture
+def storage(tmp_path: Path) -> Path:
+    """Path of an always-allow file that doesn't exist yet."""
+    return tmp_path / "always_allow.json"
+
+
 class TestAlwaysAllowManager:
     """Tests for AlwaysAllowManager class."""
 
-    def test_init_creates_file(self) -> None:
-        """Test that initialization creates the storage file."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            storage_path = Path(tmpdir) / "always_allow.json"
-            AlwaysAllowManager(storage_path)
-            assert storage_path.exists()
-            with open(storage_path) as f:
-                data = json.load(f)
-            assert data == {"tools": []}
-
-    def test_add_tool(self) -> None:
+    def test_init_does_not_create_file(self, storage: Path) -> None:
+        """Test that initialization doesn't touch a missing storage file."""
+        manager = AlwaysAllowManager(storage)
+        assert not storage.exists()
+        assert manager.get_allowed_tools() == []
+
+    def test_add_tool_creates_file(self, tmp_path: Path) -> None:
+        """Test that the first write creates the storage file and directory."""
+        storage = tmp_path / "nested" / "always_allow.json"
+        manager = AlwaysAllowManager(storage)
+        manager.add_tool("Bash")
+        with open(storage) as f:
+            data = json.load(f)
+        assert data == {"tools": ["Bash"]}
+
+    def test_add_tool(self, storage: Path) -> None:
         """Test adding a tool to always-allow list."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            storage_path = Path(tmpdir) / "always_allow.json"
-            manager = AlwaysAllowManager(storage_path)
-            manager.add_tool("Bash")
-            assert manager.is_allowed("Bash")
+        manager = AlwaysAllowManager(storage)
+        manager.add_tool("Bash")
+        assert manager.is_allowed("Bash")
 
-    def test_add_tool_no_duplicates(self) -> None:
+    def test_add_tool_no_duplicates(self, storage: Path) -> None:
         """Test that adding the same tool twice doesn't create duplicates."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            storage_path = Path(tmpdir) / "always_allow.json"
-            manager = AlwaysAllowManager(storage_path)
-            manager.add_tool("Bash")
-            manager.add_tool("Bash")
-            assert manager.get_allowed_tools() == ["Bash"]
-
-    def test_remove_tool(self) -> None:
+        manager = AlwaysAllowManager(storage)
+        manager.add_tool("Bash")
+        manager.add_tool("Bash")
+        assert manager.get_allowed_tools() == ["Bash"]
+
+    async def test_add_tool_async(self, storage: Path) -> None:
+        """Test adding a tool from async code."""
+        manager = AlwaysAllowManager(storage)
+        await manager.add_tool_async("Bash")
+        assert manager.is_allowed("Bash")
+        assert AlwaysAllowManager(storage).is_allowed("Bash")
+
+    async def test_concurrent_add_tool_async(self, storage: Path) -> None:
+        """Test that concurrent async adds from separate managers all persist."""
+        tools = ["Bash", "Edit", "Write", "Read"]
+        await asyncio.gather(
+            *(AlwaysAllowManager(storage).add_tool_async(tool) for tool in tools)
+        )
+        assert AlwaysAllowManager(storage).get_allowed_tools() == sorted(tools)
+
+    def test_remove_tool(self, storage: Path) -> None:
         """Test removing a tool from always-allow list."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            storage_path = Path(tmpdir) / "always_allow.json"
-            manager = AlwaysAllowManager(storage_path)
-            manager.add_tool("Bash")
-            manager.add_tool("Edit")
-            manager.remove_tool("Bash")
-            assert not manager.is_allowed("Bash")
-            assert manager.is_allowed("Edit")
-
-    def test_remove_nonexistent_tool(self) -> None:
+        manager = AlwaysAllowManager(storage)
+        manager.add_tool("Bash")
+        manager.add_tool("Edit")
+        manager.remove_tool("Bash")
+        assert not manager.is_allowed("Bash")
+        assert manager.is_allowed("Edit")
+
+    def test_remove_nonexistent_tool(self, storage: Path) -> None:
         """Test removing a tool that doesn't exist doesn't raise error."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            storage_path = Path(tmpdir) / "always_allow.json"
-            manager = AlwaysAllowManager(storage_path)
-            manager.remove_tool("NonExistent")  # Should not raise
+        manager = AlwaysAllowManager(storage)
+        manager.remove_tool("NonExistent")  # Should not raise
 
-    def test_is_allowed_false_for_unknown_tool(self) -> None:
+    def test_is_allowed_false_for_unknown_tool(self, storage: Path) -> None:
         """Test is_allowed returns False for unknown tools."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            storage_path = Path(tmpdir) / "always_allow.json"
-            manager = AlwaysAllowManager(storage_path)
-            assert not manager.is_allowed("Unknown")
+        manager = AlwaysAllowManager(storage)
+        assert not manager.is_allowed("Unknown")
 
-    def test_get_allowed_tools(self) -> None:
+    def test_get_allowed_tools(self, storage: Path) -> None:
         """Test getting the list of allowed tools."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            storage_path = Path(tmpdir) / "always_allow.json"
-            manager = AlwaysAllowManager(storage_path)
-            manager.add_tool("Bash")
-            manager.add_tool("Edit")
-            manager.add_tool("Write")
-            tools = manager.get_allowed_tools()
-            assert set(tools) == {"Bash", "Edit", "Write"}
-
-    def test_clear(self) -> None:
+        manager = AlwaysAllowManager(storage)
+        manager.add_tool("Bash")
+        manager.add_tool("Edit")
+        manager.add_tool("Write")
+        tools = manager.get_allowed_tools()
+        assert set(tools) == {"Bash", "Edit", "Write"}
+
+    def test_clear(self, storage: Path) -> None:
         """Test clearing all allowed tools."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            storage_path = Path(tmpdir) / "always_allow.json"
-            manager = AlwaysAllowManager(storage_path)
+        manager = AlwaysAllowManager(storage)
+        manager.add_tool("Bash")
+        manager.add_tool("Edit")
+        manager.clear()
+        assert manager.get_allowed_tools() == []
+
+    def test_unchanged_set_is_not_written(self, storage: Path) -> None:
+        """Test that no-op changes don't rewrite the storage file."""
+        manager = AlwaysAllowManager(storage)
+        manager.clear()
+        manager.remove_tool("Bash")
+        assert not storage.exists()
+
+        manager.add_tool("Bash")
+        with patch.object(manager, "_write_data") as write_data:
             manager.add_tool("Bash")
-            manager.add_tool("Edit")
-            manager.clear()
-            assert manager.get_allowed_tools() == []
+        write_data.assert_not_called()
 
-    def test_persistence(self) -> None:
+    def test_persistence(self, storage: Path) -> None:
         """Test that preferences persist across manager instances."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            storage_path = Path(tmpdir) / "always_allow.json"
+        # First instance
+        manager1 = AlwaysAllowManager(storage)
+        manager1.add_tool("Bash")
+
+        # Second instance reads the same file
+        manager2 = AlwaysAllowManager(storage)
+        assert manager2.is_allowed("Bash")
+
+    def test_file_is_sorted(self, storage: Path) -> None:
+        """Test that tools are written to disk in sorted order."""
+        manager = AlwaysAllowManager(storage)
+        manager.add_tool("Write")
+        manager.add_tool("Bash")
+        manager.add_tool("Edit")
+        with open(storage) as f:
+            data = json.load(f)
+        assert data == {"tools": ["Bash", "Edit", "Write"]}
+        assert list(storage.parent.glob("*.tmp")) == []
+
+    def test_reads_existing_list_format(self, storage: Path) -> None:
+        """Test loading a hand-edited file with duplicates and extra keys."""
+        storage.write_text(json.dumps({"tools": ["Edit", "Bash", "Edit"], "v": 1}))
+
+        manager = AlwaysAllowManager(storage)
+        assert manager.get_allowed_tools() == ["Bash", "Edit"]
+        assert manager.is_allowed("Edit")
+
+    def test_handles_missing_tools_key(self, storage: Path) -> None:
+        """Test that a file without a tools key is treated as empty."""
+        storage.write_text("{}")
+
+        manager = AlwaysAllowManager(storage)
+        assert manager.get_allowed_tools() == []
+
+    def test_handles_corrupted_file(self, storage: Path) -> None:
+        """Test that corrupted JSON file is handled gracefully."""
+        storage.write_text("invalid json {{{")
 
-            # First instance
-            manager1 = AlwaysAllowManager(storage_path)
-            manager1.add_tool("Bash")
+        manager = AlwaysAllowManager(storage)
+        assert manager.get_allowed_tools() == []
 
-            # Second instance reads the same file
-            manager2 = AlwaysAllowManager(storage_path)
-            assert manager2.is_allowed("Bash")
+    def test_reuses_cached_tools_for_unchanged_file(self, storage: Path) -> None:
+        """Test that a new manager doesn't re-read an unchanged file."""
+        AlwaysAllowManager(storage).add_tool("Bash")
 
-    def test_handles_corrupted_file(self) -> None:
-        """Test that corrupted JSON file is handled gracefully."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            storage_path = Path(tmpdir) / "always_allow.json"
-            storage_path.write_text("invalid json {{{")
+        with patch.object(AlwaysAllowManager, "_read_data") as read_data:
+            manager = AlwaysAllowManager(storage)
+        read_data.assert_not_called()
+        assert manager.is_allowed("Bash")
+
+    def test_reloads_after_external_change(self, storage: Path) -> None:
+        """Test that changes made by another process are picked up."""
+        AlwaysAllowManager(storage).add_tool("Bash")
+
+        storage.write_text(json.dumps({"tools": ["Edit"]}))
+        mtime_ns = storage.stat().st_mtime_ns + 1_000_000
+        os.utime(storage, ns=(mtime_ns, mtime_ns))
+
+        manager = AlwaysAllowManager(storage)
+        assert manager.get_allowed_tools() == ["Edit"]
+
+    def test_concurrent_managers_keep_each_others_tools(self, storage: Path) -> None:
+        """Test that a write from one manager doesn't drop another's tools."""
+        manager1 = AlwaysAllowManager(storage)
+        manager2 = AlwaysAllowManager(storage)
+        manager1.add_tool("Bash")
+        manager2.add_tool("Edit")
+
+        assert json.loads(storage.read_text()) == {"tools": ["Bash", "Edit"]}
+        assert manager2.is_allowed("Bash")
+
+    def test_writes_use_distinct_temporary_files(self, storage: Path) -> None:
+        """Test that overlapping writes in one process don't share a temporary file."""
+        manager = AlwaysAllowManager(storage)
+        with patch("claude_code_telegram.always_allow.os.replace") as replace:
+            manager._write_data({"tools": ["Bash"]})
+            manager._write_data({"tools": ["Edit"]})
+
+        first, second = (call.args[0] for call in replace.call_args_list)
+        assert first != second
+        assert first.parent == storage.parent
+
+    def test_write_racing_another_process_isnt_cached(self, storage: Path) -> None:
+        """Test that a write landing between ours and the cache update is re-read."""
+        real_replace = os.replace
+
+        def replace_then_overwrite(src: Path, dst: Path) -> None:
+            real_replace(src, dst)
+            # Another process writes right after our replace
+            storage.write_text(json.dumps({"tools": ["Edit", "Read"]}))
+
+        with patch("claude_code_telegram.always_allow.os.replace", replace_then_overwrite):
+            AlwaysAllowManager(storage).add_tool("Bash")
 
-            manager = AlwaysAllowManager(storage_path)
-            assert manager.get_allowed_tools() == []
+        assert AlwaysAllowManager(storage).get_allowed_tools() == ["Edit", "Read"]
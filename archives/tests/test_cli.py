@@ -0,0 +1,33 @@
+"""Tests for CLI module."""
+
+from unittest.mock import patch
+
+import pytest
+
+from claude_code_telegram import cli
+
+
+class TestMain:
+    """Tests for the CLI entry point."""
+
+    def test_dispatches_subcommand(self) -> None:
+        """Test that a known subcommand runs its module's main()."""
+        with patch("sys.argv", ["claude-code-telegram", "stop"]):
+            with patch("claude_code_telegram.stop_handler.main") as stop_main:
+                cli.main()
+        stop_main.assert_called_once_with()
+
+    def test_no_command_prints_help(self, capsys: pytest.CaptureFixture[str]) -> None:
+        """Test that running without a subcommand prints help and exits."""
+        with patch("sys.argv", ["claude-code-telegram"]):
+            with pytest.raises(SystemExit) as exc_info:
+                cli.main()
+        assert exc_info.value.code == 1
+        assert "hook" in capsys.readouterr().out
+
+    def test_unknown_command_is_rejected(self) -> None:
+        """Test that an unknown subcommand is a usage error."""
+        with patch("sys.argv", ["claude-code-telegram", "unknown"]):
+            with pytest.raises(SystemExit) as exc_info:
+                cli.main()
+        assert exc_info.value.code == 2
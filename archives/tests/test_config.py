@@ -8,7 +8,7 @@ from unittest.mock import patch
 
 import pytest
 
-from claude_code_telegram.config import Config, get_project_root
+from claude_code_telegram.config import Config, get_hostname, get_project_root
 
 
 class TestConfig:
@@ -16,8 +16,8 @@ class TestConfig:
 
     def test_from_env_success(self) -> None:
         """Test successful config loading from environment."""
-        with patch("claude_code_telegram.config.load_dotenv"):
-            with patch("claude_code_telegram.config.socket.gethostname", return_value="test-host"):
+        with patch("dotenv.load_dotenv"):
+            with patch("claude_code_telegram.config.get_hostname", return_value="test-host"):
                 with patch.dict(
                     os.environ,
                     {
@@ -33,18 +33,51 @@ class TestConfig:
 
     def test_from_env_missing_token(self) -> None:
         """Test error when bot token is missing."""
-        with patch("claude_code_telegram.config.load_dotenv"):
+        with patch("dotenv.load_dotenv"):
             with patch.dict(os.environ, {"TELEGRAM_CHAT_ID": "123456"}, clear=True):
                 with pytest.raises(ValueError, match="TELEGRAM_BOT_TOKEN"):
                     Config.from_env()
 
     def test_from_env_missing_chat_id(self) -> None:
         """Test error when chat ID is missing."""
-        with patch("claude_code_telegram.config.load_dotenv"):
+        with patch("dotenv.load_dotenv"):
             with patch.dict(os.environ, {"TELEGRAM_BOT_TOKEN": "test_token"}, clear=True):
                 with pytest.raises(ValueError, match="TELEGRAM_CHAT_ID"):
                     Config.from_env()
 
+    def test_from_env_webhook_settings(self) -> None:
+        """Test loading optional webhook settings from environment."""
+        with patch("dotenv.load_dotenv"):
+            with patch.dict(
+                os.environ,
+                {
+                    "TELEGRAM_BOT_TOKEN": "test_token",
+                    "TELEGRAM_CHAT_ID": "123456",
+                    "TELEGRAM_WEBHOOK_URL": "https://example.com/hook",
+                    "TELEGRAM_WEBHOOK_PORT": "8080",
+                },
+                clear=True,
+            ):
+                config = Config.from_env()
+                assert config.webhook_url == "https://example.com/hook"
+                assert config.webhook_port == 8080
+                assert config.webhook_secret_token is None
+
+    def test_from_env_invalid_webhook_port(self) -> None:
+        """Test error when the webhook port is not an integer."""
+        with patch("dotenv.load_dotenv"):
+            with patch.dict(
+                os.environ,
+                {
+                    "TELEGRAM_BOT_TOKEN": "test_token",
+                    "TELEGRAM_CHAT_ID": "123456",
+                    "TELEGRAM_WEBHOOK_PORT": "http",
+                },
+                clear=True,
+            ):
+                with pytest.raises(ValueError, match="webhook_port"):
+                    Config.from_env()
+
 
 class TestConfigFromJson:
     """Tests for Config.from_json method."""
@@ -58,7 +91,7 @@ class TestConfigFromJson:
                 "telegram_chat_id": "654321"
             }))
 
-            with patch("claude_code_telegram.config.socket.gethostname", return_value="json-host"):
+            with patch("claude_code_telegram.config.get_hostname", return_value="json-host"):
                 config = Config.from_json(config_path)
                 assert config.telegram_bot_token == "json_token"
                 assert config.telegram_chat_id == "654321"
@@ -73,7 +106,7 @@ class TestConfigFromJson:
                 "telegram_chat_id": 123456  # int, not string
             }))
 
-            with patch("claude_code_telegram.config.socket.gethostname", return_value="host"):
+            with patch("claude_code_telegram.config.get_hostname", return_value="host"):
                 config = Config.from_json(config_path)
                 assert config.telegram_chat_id == "123456"
                 assert isinstance(config.telegram_chat_id, str)
@@ -105,6 +138,58 @@ class TestConfigFromJson:
             with pytest.raises(ValueError, match="telegram_chat_id"):
                 Config.from_json(config_path)
 
+    def test_from_json_webhook_defaults(self) -> None:
+        """Test that webhook mode is off unless configured."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            config_path = Path(tmpdir) / "config.json"
+            config_path.write_text(json.dumps({
+                "telegram_bot_token": "token",
+                "telegram_chat_id": "123456"
+            }))
+
+            config = Config.from_json(config_path)
+            assert config.webhook_url is None
+            assert config.webhook_port == 8443
+            assert config.connection_pool_size == 32
+            assert config.get_updates_connection_pool_size == 4
+
+    def test_from_json_webhook_settings(self) -> None:
+        """Test loading optional webhook settings from JSON."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            config_path = Path(tmpdir) / "config.json"
+            config_path.write_text(json.dumps({
+                "telegram_bot_token": "token",
+                "telegram_chat_id": "123456",
+                "webhook_url": "https://example.com/hook",
+                "webhook_port": 443,
+                "webhook_secret_token": "secret",
+                "connection_pool_size": 8
+            }))
+
+            config = Config.from_json(config_path)
+            assert config.connection_pool_size == 8
+            assert config.webhook_url == "https://example.com/hook"
+            assert config.webhook_port == 443
+            assert config.webhook_secret_token == "secret"
+
+    def test_from_json_reloads_when_file_changes(self) -> None:
+        """Test that a cached config is re-read after the file is modified."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            config_path = Path(tmpdir) / "config.json"
+            config_path.write_text(json.dumps({
+                "telegram_bot_token": "token1",
+                "telegram_chat_id": "111"
+            }))
+            assert Config.from_json(config_path).telegram_bot_token == "token1"
+
+            config_path.write_text(json.dumps({
+                "telegram_bot_token": "token2",
+                "telegram_chat_id": "111"
+            }))
+            mtime_ns = config_path.stat().st_mtime_ns + 1_000_000
+            os.utime(config_path, ns=(mtime_ns, mtime_ns))
+            assert Config.from_json(config_path).telegram_bot_token == "token2"
+
 
 class TestConfigLoad:
     """Tests for Config.load method."""
@@ -118,7 +203,7 @@ class TestConfigLoad:
                 "telegram_chat_id": "111"
             }))
 
-            with patch("claude_code_telegram.config.socket.gethostname", return_value="host"):
+            with patch("claude_code_telegram.config.get_hostname", return_value="host"):
                 with patch.dict(os.environ, {
                     "TELEGRAM_BOT_TOKEN": "env_token",
                     "TELEGRAM_CHAT_ID": "222"
@@ -129,8 +214,8 @@ class TestConfigLoad:
 
     def test_load_falls_back_to_env(self) -> None:
         """Test that load() falls back to env vars when JSON doesn't exist."""
-        with patch("claude_code_telegram.config.load_dotenv"):
-            with patch("claude_code_telegram.config.socket.gethostname", return_value="host"):
+        with patch("dotenv.load_dotenv"):
+            with patch("claude_code_telegram.config.get_hostname", return_value="host"):
                 with patch.dict(os.environ, {
                     "TELEGRAM_BOT_TOKEN": "env_token",
                     "TELEGRAM_CHAT_ID": "222"
@@ -141,6 +226,23 @@ class TestConfigLoad:
                     assert config.telegram_chat_id == "222"
 
 
+class TestGetHostname:
+    """Tests for get_hostname function."""
+
+    def test_hostname_is_cached(self) -> None:
+        """Test that the hostname is looked up only once."""
+        get_hostname.cache_clear()
+        try:
+            with patch(
+                "claude_code_telegram.config.socket.gethostname", return_value="cached-host"
+            ) as gethostname:
+                assert get_hostname() == "cached-host"
+                assert get_hostname() == "cached-host"
+                gethostname.assert_called_once()
+        finally:
+            get_hostname.cache_clear()
+
+
 class TestGetProjectRoot:
     """Tests for get_project_root function."""
 
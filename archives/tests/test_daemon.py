@@ -0,0 +1,270 @@
+"""Tests for the hook daemon and its thin client."""
+
+import asyncio
+import fcntl
+import io
+import os
+import subprocess
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from claude_code_telegram import hook_client
+from claude_code_telegram.daemon import HookDaemon
+
+RESPONSE = b'{"hookSpecificOutput":{}}\n'
+
+
+async def wait_for_socket(path: Path) -> None:
+    """Wait until the daemon has bound its socket."""
+    while not path.exists():
+        await asyncio.sleep(0.01)
+
+
+class TestHookDaemon:
+    """Tests for HookDaemon."""
+
+    async def test_forwards_hook_input_to_handler(self, tmp_path: Path) -> None:
+        """Test that the client gets the handler's response for its input."""
+        socket_path = tmp_path / "d.sock"
+        daemon = HookDaemon(socket_path, idle_timeout=0.1)
+        handle = AsyncMock(return_value=RESPONSE)
+
+        with (
+            patch("claude_code_telegram.hook_handler.handle_hook_input", handle),
+            patch("claude_code_telegram.hook_handler.shutdown", AsyncMock()) as shutdown,
+            patch.object(hook_client, "SOCKET_PATH", socket_path),
+        ):
+            serving = asyncio.create_task(daemon.serve())
+            await wait_for_socket(socket_path)
+            sock = hook_client._connect()
+            assert sock is not None
+            response = await asyncio.to_thread(hook_client.forward, sock, b'{"tool_name":"Bash"}')
+            await serving
+
+        assert response == RESPONSE
+        handle.assert_awaited_once_with(b'{"tool_name":"Bash"}')
+        shutdown.assert_awaited_once()
+        assert not socket_path.exists()
+
+    async def test_handler_error_closes_without_response(self, tmp_path: Path) -> None:
+        """Test that a failing hook gets an empty response instead of hanging."""
+        socket_path = tmp_path / "d.sock"
+        daemon = HookDaemon(socket_path, idle_timeout=0.1)
+
+        with (
+            patch(
+                "claude_code_telegram.hook_handler.handle_hook_input",
+                AsyncMock(side_effect=ValueError("bad config")),
+            ),
+            patch("claude_code_telegram.hook_handler.shutdown", AsyncMock()),
+            patch.object(hook_client, "SOCKET_PATH", socket_path),
+        ):
+            serving = asyncio.create_task(daemon.serve())
+            await wait_for_socket(socket_path)
+            sock = hook_client._connect()
+            assert sock is not None
+            response = await asyncio.to_thread(hook_client.forward, sock, b"{}")
+            await serving
+
+        assert response == b""
+
+    async def test_idle_shutdown_waits_for_accepted_connection(self, tmp_path: Path) -> None:
+        """Test that a connection accepted as the daemon goes idle still gets its response."""
+        socket_path = tmp_path / "d.sock"
+        daemon = HookDaemon(socket_path, idle_timeout=60)
+        events = []
+
+        async def handle(data: bytes) -> bytes:
+            daemon._stopped.set()
+            await asyncio.sleep(0.1)
+            events.append("handled")
+            return RESPONSE
+
+        async def shutdown() -> None:
+            events.append("shutdown")
+
+        with (
+            patch("claude_code_telegram.hook_handler.handle_hook_input", handle),
+            patch("claude_code_telegram.hook_handler.shutdown", shutdown),
+            patch.object(hook_client, "SOCKET_PATH", socket_path),
+        ):
+            serving = asyncio.create_task(daemon.serve())
+            await wait_for_socket(socket_path)
+            sock = hook_client._connect()
+            assert sock is not None
+            response = await asyncio.to_thread(hook_client.forward, sock, b"{}")
+            await serving
+
+        assert response == RESPONSE
+        assert events == ["handled", "shutdown"]
+
+    async def test_replaces_stale_socket(self, tmp_path: Path) -> None:
+        """Test that a socket file left by a dead daemon doesn't block startup."""
+        socket_path = tmp_path / "d.sock"
+        socket_path.write_bytes(b"")
+        daemon = HookDaemon(socket_path, idle_timeout=0.01)
+
+        with patch("claude_code_telegram.hook_handler.shutdown", AsyncMock()):
+            await daemon.serve()
+
+        assert not socket_path.exists()
+
+
+class TestHookClient:
+    """Tests for the thin hook client."""
+
+    def test_connect_without_daemon(self, tmp_path: Path) -> None:
+        """Test that a missing socket means no connection."""
+        with patch.object(hook_client, "SOCKET_PATH", tmp_path / "missing.sock"):
+            assert hook_client._connect() is None
+
+    def test_falls_back_in_process(self) -> None:
+        """Test that the hook is handled in-process when the daemon can't start."""
+        stdin = SimpleNamespace(buffer=io.BytesIO(b'{"tool_name":"Bash"}'))
+
+        with (
+            patch("sys.stdin", stdin),
+            patch.object(hook_client, "_connect", return_value=None),
+            patch.object(hook_client, "_spawn_daemon") as spawn,
+            patch.object(hook_client, "SPAWN_TIMEOUT", 0.0),
+            patch.object(hook_client, "_take_fallback_lock", return_value=True),
+            patch("claude_code_telegram.hook_handler.async_main", AsyncMock()) as async_main,
+        ):
+            hook_client.main()
+
+        spawn.assert_called_once_with()
+        async_main.assert_awaited_once_with(b'{"tool_name":"Bash"}')
+
+    def test_no_fallback_while_daemon_holds_lock(self, tmp_path: Path) -> None:
+        """Test that a starting daemon isn't joined by a second in-process poller."""
+        stdin = SimpleNamespace(buffer=io.BytesIO(b"{}"))
+        lock_path = tmp_path / "d.lock"
+
+        with (
+            open(lock_path, "w") as daemon_lock,
+            patch("sys.stdin", stdin),
+            patch.object(hook_client, "LOCK_PATH", lock_path),
+            patch.object(hook_client, "_connect", return_value=None),
+            patch.object(hook_client, "_spawn_daemon"),
+            patch.object(hook_client, "SPAWN_TIMEOUT", 0.0),
+            patch.object(hook_client, "STARTUP_TIMEOUT", 0.1),
+            patch("claude_code_telegram.hook_handler.async_main", AsyncMock()) as async_main,
+        ):
+            fcntl.flock(daemon_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            with pytest.raises(SystemExit):
+                hook_client.main()
+
+        async_main.assert_not_awaited()
+
+    def test_fallback_lock_keeps_daemon_out(self, tmp_path: Path) -> None:
+        """Test that the in-process fallback stops a late daemon from taking the lock."""
+        lock_path = tmp_path / "d.lock"
+
+        with (
+            patch.object(hook_client, "LOCK_PATH", lock_path),
+            patch.object(hook_client, "_fallback_lock", None),
+        ):
+            assert hook_client._take_fallback_lock()
+            with open(lock_path, "w") as daemon_lock:
+                with pytest.raises(BlockingIOError):
+                    fcntl.flock(daemon_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            assert hook_client._fallback_lock is not None
+            hook_client._fallback_lock.close()
+
+    def test_daemon_running(self, tmp_path: Path) -> None:
+        """Test that a daemon is detected by the lock it holds."""
+        lock_path = tmp_path / "d.lock"
+
+        with patch.object(hook_client, "LOCK_PATH", lock_path):
+            assert not hook_client.daemon_running()
+            with open(lock_path, "w") as daemon_lock:
+                fcntl.flock(daemon_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                assert hook_client.daemon_running()
+            assert not hook_client.daemon_running()
+
+    def test_spawn_ignores_working_directory(self, tmp_path: Path) -> None:
+        """Test that the daemon neither runs in nor imports from the caller's cwd."""
+        with (
+            patch.dict(os.environ),
+            patch.object(hook_client, "SOCKET_PATH", tmp_path / "d.sock"),
+            patch.object(hook_client, "LOG_PATH", tmp_path / "d.log"),
+            patch("subprocess.Popen") as popen,
+        ):
+            os.environ.pop("PEX", None)
+            hook_client._spawn_daemon()
+
+        command = popen.call_args.args[0]
+        package_root = Path(hook_client.__file__).resolve().parent.parent
+        assert command[1:3] == ["-I", "-c"]
+        assert command[4:] == [str(package_root), "daemon"]
+        assert popen.call_args.kwargs["cwd"] == tmp_path
+        assert "env" not in popen.call_args.kwargs
+
+    def test_daemon_bootstrap_skips_working_directory(self, tmp_path: Path) -> None:
+        """Test that a package in the working directory can't shadow the daemon's imports."""
+        (tmp_path / "telegram").mkdir()
+        (tmp_path / "telegram" / "__init__.py").write_text("raise SystemExit('shadowed')")
+
+        with patch.dict(os.environ):
+            os.environ.pop("PEX", None)
+            command = hook_client._daemon_command()
+        # Import telegram the way the daemon would, instead of running it
+        command[3] = command[3].replace("main()", "import telegram")
+        result = subprocess.run(command, cwd=tmp_path, capture_output=True, text=True)
+
+        assert result.returncode == 0, result.stderr
+
+    def test_daemon_command_reruns_pex(self) -> None:
+        """Test that a PEX-packaged hook starts the daemon from the same PEX file."""
+        with patch.dict(os.environ, {"PEX": "/opt/claude-code-telegram.pex"}):
+            command = hook_client._daemon_command()
+
+        assert command[1:] == ["/opt/claude-code-telegram.pex", "daemon"]
+
+    def test_writes_daemon_response(self) -> None:
+        """Test that the daemon's response is written to stdout unchanged."""
+        stdin = SimpleNamespace(buffer=io.BytesIO(b"{}"))
+        stdout = SimpleNamespace(buffer=io.BytesIO())
+
+        with (
+            patch("sys.stdin", stdin),
+            patch("sys.stdout", stdout),
+            patch.object(hook_client, "_connect", return_value=MagicMock()),
+            patch.object(hook_client, "forward", return_value=RESPONSE),
+        ):
+            hook_client.main()
+
+        assert stdout.buffer.getvalue() == RESPONSE
+
+    def test_retries_when_daemon_stops_accepting(self) -> None:
+        """Test that a connection dropped by an exiting daemon is retried once."""
+        stdin = SimpleNamespace(buffer=io.BytesIO(b"{}"))
+        stdout = SimpleNamespace(buffer=io.BytesIO())
+
+        with (
+            patch("sys.stdin", stdin),
+            patch("sys.stdout", stdout),
+            patch.object(hook_client, "_connect", return_value=MagicMock()),
+            patch.object(
+                hook_client, "forward", side_effect=[ConnectionResetError(), RESPONSE]
+            ) as forward,
+        ):
+            hook_client.main()
+
+        assert forward.call_count == 2
+        assert stdout.buffer.getvalue() == RESPONSE
+
+    def test_empty_daemon_response_fails(self) -> None:
+        """Test that a daemon error fails the hook rather than writing nothing."""
+        stdin = SimpleNamespace(buffer=io.BytesIO(b"{}"))
+
+        with (
+            patch("sys.stdin", stdin),
+            patch.object(hook_client, "_connect", return_value=MagicMock()),
+            patch.object(hook_client, "forward", return_value=b""),
+        ):
+            with pytest.raises(SystemExit):
+                hook_client.main()
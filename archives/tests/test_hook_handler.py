@@ -1,6 +1,46 @@
 """Tests for hook handler module."""
 
-from claude_code_telegram.hook_handler import PermissionRequest, create_hook_response
+import asyncio
+import json
+from pathlib import Path
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from claude_code_telegram import hook_handler
+from claude_code_telegram.always_allow import AlwaysAllowManager
+from claude_code_telegram.config import Config
+from claude_code_telegram.hook_handler import (
+    DecisionHandler,
+    PermissionRequest,
+    _elide_middle,
+    _response_bytes,
+    _truncated_dumps,
+    create_hook_response,
+)
+
+
+def make_handler(tmp_path: Path) -> DecisionHandler:
+    """Create a DecisionHandler with test config and a temporary allow list."""
+    config = Config(telegram_bot_token="TOKEN", telegram_chat_id="123", hostname="host")
+    return DecisionHandler(config, AlwaysAllowManager(tmp_path / "always_allow.json"))
+
+
+def make_app() -> MagicMock:
+    """Create a fake Application whose bot records sent messages."""
+    app = MagicMock()
+    app.bot.send_message = AsyncMock()
+    return app
+
+
+def make_query(data: str) -> MagicMock:
+    """Create a fake callback query carrying the given callback data."""
+    query = MagicMock()
+    query.data = data
+    query.answer = AsyncMock()
+    query.edit_message_text = AsyncMock()
+    return query
 
 
 class TestPermissionRequest:
@@ -16,6 +56,7 @@ class TestPermissionRequest:
         assert request.tool_name == "Bash"
         assert request.tool_input["command"] == "ls -la"
         assert len(request.request_id) == 8
+        assert hook_handler.CALLBACK_DATA_PATTERN.match(f"{request.request_id}:allow")
 
     def test_from_hook_input_edit(self) -> None:
         """Test parsing Edit tool input."""
@@ -62,6 +103,16 @@ class TestPermissionRequest:
         assert "my-macbook" in message
         assert "Host" in message
 
+    def test_format_message_with_project(self) -> None:
+        """Test that the message names the project the request comes from."""
+        request = PermissionRequest.from_hook_input({
+            "tool_name": "Bash",
+            "tool_input": {"command": "ls"},
+            "cwd": "/home/user/my-project",
+        })
+        message = request.format_message()
+        assert "<b>Project:</b> <code>my-project</code>" in message
+
     def test_format_message_without_hostname(self) -> None:
         """Test formatting message without hostname."""
         request = PermissionRequest(
@@ -89,6 +140,100 @@ class TestPermissionRequest:
         assert "foo" in message
         assert "bar" in message
 
+    def test_format_message_other_tool(self) -> None:
+        """Test formatting other tools shows their input as JSON."""
+        request = PermissionRequest(
+            tool_name="WebFetch",
+            tool_input={"url": "https://example.com", "prompt": "요약"},
+            request_id="abc12345",
+        )
+        message = request.format_message()
+        assert '<code class="language-json">' in message
+        assert '"url": "https://example.com"' in message
+        assert "요약" in message
+
+    def test_format_message_escapes_html(self) -> None:
+        """Test that tool input can't inject or break HTML markup."""
+        request = PermissionRequest(
+            tool_name="Bash",
+            tool_input={"command": "cat <a.txt && echo '</pre>' ```"},
+            request_id="abc12345",
+        )
+        message = request.format_message(hostname="<host>")
+        assert "<pre>cat &lt;a.txt &amp;&amp; echo '&lt;/pre&gt;' ```</pre>" in message
+        assert "<code>&lt;host&gt;</code>" in message
+
+    def test_format_message_caps_long_command(self) -> None:
+        """Test that a huge command is cut in the middle to fit in one message."""
+        command = "head " + "x" * 10_000 + " tail"
+        request = PermissionRequest(
+            tool_name="Bash", tool_input={"command": command}, request_id="abc12345"
+        )
+        message = request.format_message(hostname="my-macbook")
+        # Telegram counts the text after entities are parsed, in UTF-16 code units
+        parsed = message.replace("&lt;", "<").replace("&gt;", ">")
+        assert len(parsed.encode("utf-16-le")) // 2 <= hook_handler.MESSAGE_MAX_UNITS
+        assert "<pre>head " in message
+        assert " tail</pre>" in message
+        assert "&lt;truncated&gt;" in message
+
+
+class TestTruncatedDumps:
+    """Tests for _truncated_dumps function."""
+
+    @pytest.mark.parametrize(
+        "obj",
+        [
+            {},
+            {"command": "ls"},
+            {"content": "x" * 10_000},
+            {"items": list(range(10_000))},
+            {f"key{i}": {"nested": [i, "y" * 30]} for i in range(1_000)},
+            {"a": "x" * 490, "content": "y" * 10_000},
+            {"k" * 600: "y" * 10_000},
+        ],
+    )
+    def test_matches_truncated_full_dump(self, obj: Any) -> None:
+        """Test that output equals the full indented JSON cut to the limit."""
+        full = json.dumps(obj, indent=2, ensure_ascii=False)
+        expected = full if len(full) <= 500 else full[:500] + "..."
+        assert _truncated_dumps(obj) == expected
+
+    @pytest.mark.parametrize(
+        "obj",
+        [
+            {"a": "x" * 490, "content": "y" * 20_000_000},
+            {"k" * 600: "y" * 20_000_000},
+        ],
+    )
+    def test_exhausted_budget_drops_large_values(self, obj: Any) -> None:
+        """Test that a value reached after the budget runs out isn't copied."""
+        clipped, _ = hook_handler._clip(obj, 500)
+        assert sum(len(value) for value in clipped.values()) <= 500
+
+
+class TestElideMiddle:
+    """Tests for _elide_middle helper."""
+
+    def test_short_text_unchanged(self) -> None:
+        """Test that text within the limit is returned as is."""
+        assert _elide_middle("abc", 3) == "abc"
+
+    def test_cuts_middle_to_limit(self) -> None:
+        """Test that the start and end are kept around the elision marker."""
+        text = "a" * 50 + "b" * 50
+        elided = _elide_middle(text, 40)
+        assert len(elided) == 40
+        assert elided.startswith("a")
+        assert elided.endswith("b")
+        assert hook_handler.ELISION in elided
+
+    def test_counts_utf16_code_units(self) -> None:
+        """Test that characters outside the BMP count as two code units."""
+        elided = _elide_middle("😀" * 100, 50)
+        assert len(elided.encode("utf-16-le")) // 2 <= 50
+        assert elided.startswith("😀")
+
 
 class TestCreateHookResponse:
     """Tests for create_hook_response function."""
@@ -107,3 +252,204 @@ class TestCreateHookResponse:
         """Test that invalid decisions default to deny."""
         response = create_hook_response("invalid")
         assert response["hookSpecificOutput"]["decision"]["behavior"] == "deny"
+
+    @pytest.mark.parametrize("decision", ["allow", "deny", "invalid"])
+    def test_response_bytes_match_response(self, decision: str) -> None:
+        """Test that pre-serialized responses match create_hook_response."""
+        line = _response_bytes(decision)
+        assert line.endswith(b"\n")
+        assert json.loads(line) == create_hook_response(decision)
+
+
+class TestDecisionHandler:
+    """Tests for DecisionHandler class."""
+
+    async def test_auto_approved_uses_shared_bot(self, tmp_path: Path) -> None:
+        """Test that auto-approved tools are announced with a single send_message."""
+        handler = make_handler(tmp_path)
+        handler.always_allow_manager.add_tool("Bash")
+        request = PermissionRequest("Bash", {"command": "ls"}, "abc12345")
+        bot = MagicMock()
+        bot.send_message = AsyncMock()
+
+        with patch.object(hook_handler, "_get_bot", return_value=bot):
+            with patch.object(hook_handler, "_get_application") as get_application:
+                decision = await handler.send_request_and_wait(request)
+
+        assert decision == "allow"
+        get_application.assert_not_called()
+        bot.send_message.assert_awaited_once()
+        assert "Auto-Approved" in bot.send_message.call_args.kwargs["text"]
+
+    async def test_auto_approved_edit_omits_diff(self, tmp_path: Path) -> None:
+        """Test that auto-approved Edit notifications show the file but no diff."""
+        handler = make_handler(tmp_path)
+        request = PermissionRequest(
+            "Edit",
+            {"file_path": "/test.py", "old_string": "foo", "new_string": "bar"},
+            "abc12345",
+        )
+        bot = MagicMock()
+        bot.send_message = AsyncMock()
+
+        with patch.object(hook_handler, "_get_bot", return_value=bot):
+            await handler.send_auto_approved_notification(request)
+
+        text = bot.send_message.call_args.kwargs["text"]
+        assert "/test.py" in text
+        assert "foo" not in text
+        assert "bar" not in text
+
+    async def test_request_times_out_as_deny(self, tmp_path: Path) -> None:
+        """Test that no button press within the timeout denies the request."""
+        handler = make_handler(tmp_path)
+        request = PermissionRequest("Bash", {"command": "ls"}, "abc12345")
+
+        with patch.object(hook_handler, "_get_application", AsyncMock(return_value=make_app())):
+            with patch.object(hook_handler, "DECISION_TIMEOUT", 0.01):
+                decision = await handler.send_request_and_wait(request)
+
+        assert decision == "deny"
+        assert "abc12345" not in hook_handler._PENDING
+
+    async def test_request_waits_for_button_press(self, tmp_path: Path) -> None:
+        """Test that the decision from a button press is returned."""
+        handler = make_handler(tmp_path)
+        request = PermissionRequest("Bash", {"command": "ls"}, "abc12345")
+        app = make_app()
+
+        async def press_allow(**kwargs: Any) -> None:
+            query = make_query(kwargs["reply_markup"].inline_keyboard[0][0].callback_data)
+            asyncio.get_running_loop().call_soon(
+                asyncio.ensure_future,
+                hook_handler._dispatch_callback(MagicMock(callback_query=query), MagicMock()),
+            )
+
+        app.bot.send_message.side_effect = press_allow
+        with patch.object(hook_handler, "_get_application", AsyncMock(return_value=app)):
+            decision = await handler.send_request_and_wait(request)
+
+        assert decision == "allow"
+        assert "abc12345" not in hook_handler._PENDING
+
+    async def test_dispatch_routes_to_pending_handler(self, tmp_path: Path) -> None:
+        """Test that a button press reaches the handler for its request ID."""
+        handler = make_handler(tmp_path)
+        handler.message_text = "request message"
+        query = make_query("abc12345:always_allow:Bash")
+
+        with patch.dict(hook_handler._PENDING, {"abc12345": handler}):
+            await hook_handler._dispatch_callback(MagicMock(callback_query=query), MagicMock())
+
+        query.answer.assert_awaited_once()
+        query.edit_message_text.assert_awaited_once()
+        assert query.edit_message_text.call_args.kwargs["text"].startswith("request message\n\n")
+        assert handler.decision == "allow"
+        assert handler.decision_event.is_set()
+        assert handler.always_allow_manager.is_allowed("Bash")
+
+    async def test_dispatch_keeps_colons_in_tool_name(self, tmp_path: Path) -> None:
+        """Test that tool names containing colons are passed through intact."""
+        handler = make_handler(tmp_path)
+        handler.message_text = "request message"
+        query = make_query("abc12345:always_allow:mcp:server:tool")
+
+        with patch.dict(hook_handler._PENDING, {"abc12345": handler}):
+            await hook_handler._dispatch_callback(MagicMock(callback_query=query), MagicMock())
+
+        assert handler.always_allow_manager.is_allowed("mcp:server:tool")
+
+    async def test_dispatch_ignores_unknown_request(self, tmp_path: Path) -> None:
+        """Test that stale buttons are answered but change nothing."""
+        handler = make_handler(tmp_path)
+        query = make_query("deadbeef:allow")
+
+        with patch.dict(hook_handler._PENDING, {"abc12345": handler}):
+            await hook_handler._dispatch_callback(MagicMock(callback_query=query), MagicMock())
+
+        query.answer.assert_awaited_once()
+        query.edit_message_text.assert_not_awaited()
+        assert handler.decision is None
+
+    async def test_application_refuses_webhook_token(self) -> None:
+        """Test that the hook won't delete a webhook set on its bot token."""
+        app = make_app()
+        app.initialize = AsyncMock()
+        app.shutdown = AsyncMock()
+        app.updater.start_polling = AsyncMock()
+        app.bot.get_webhook_info = AsyncMock(return_value=MagicMock(url="https://example.com"))
+
+        with (
+            patch("telegram.ext.Application.builder") as builder,
+            patch.object(hook_handler, "_app", None),
+        ):
+            builder.return_value.token.return_value.build.return_value = app
+            with pytest.raises(RuntimeError, match="webhook"):
+                await hook_handler._get_application("TOKEN")
+            assert hook_handler._app is None
+
+        app.updater.start_polling.assert_not_awaited()
+        app.shutdown.assert_awaited_once()
+
+    def test_build_keyboard(self) -> None:
+        """Test that the buttons carry this request's ID and tool name."""
+        keyboard = hook_handler._build_keyboard("abc12345", "Bash").inline_keyboard
+        assert [[b.callback_data for b in row] for row in keyboard] == [
+            ["abc12345:allow", "abc12345:deny"],
+            ["abc12345:always_allow:Bash"],
+        ]
+        assert keyboard[0][0].text == hook_handler._ALLOW_LABEL
+
+    def test_callback_data_pattern(self) -> None:
+        """Test that only this hook's callback data matches the handler pattern."""
+        assert hook_handler.CALLBACK_DATA_PATTERN.match("abc12345:allow")
+        assert hook_handler.CALLBACK_DATA_PATTERN.match("abc12345:always_allow:mcp:tool")
+        assert not hook_handler.CALLBACK_DATA_PATTERN.match("something-else")
+
+
+class TestRequestDecision:
+    """Tests for sharing decisions between identical requests."""
+
+    def test_key_ignores_input_key_order(self) -> None:
+        """Test that equal tool calls get the same key and different ones don't."""
+        a = PermissionRequest("Edit", {"file_path": "/f", "old_string": "x"}, "1")
+        b = PermissionRequest("Edit", {"old_string": "x", "file_path": "/f"}, "2")
+        c = PermissionRequest("Edit", {"file_path": "/g", "old_string": "x"}, "3")
+
+        assert a.key == b.key
+        assert a.key != c.key
+
+    def test_key_differs_by_cwd(self) -> None:
+        """Test that the same tool call from different projects isn't shared."""
+        a = PermissionRequest("Bash", {"command": "rm -rf build"}, "1", cwd="/src/a")
+        b = PermissionRequest("Bash", {"command": "rm -rf build"}, "2", cwd="/src/b")
+
+        assert a.key != b.key
+
+    async def test_identical_requests_share_one_prompt(self) -> None:
+        """Test that concurrent identical requests prompt once and share the decision."""
+        config = Config(telegram_bot_token="TOKEN", telegram_chat_id="123", hostname="host")
+        release = asyncio.Event()
+
+        async def send(self: DecisionHandler, request: PermissionRequest) -> str:
+            await release.wait()
+            return "allow"
+
+        with patch.object(
+            DecisionHandler, "send_request_and_wait", autospec=True, side_effect=send
+        ) as mock_send:
+            waiters = [
+                asyncio.create_task(
+                    hook_handler.request_decision(
+                        config, PermissionRequest("Bash", {"command": "ls"}, str(i))
+                    )
+                )
+                for i in range(3)
+            ]
+            await asyncio.sleep(0)
+            release.set()
+            decisions = await asyncio.gather(*waiters)
+
+        assert decisions == ["allow", "allow", "allow"]
+        assert mock_send.await_count == 1
+        assert hook_handler._INFLIGHT == {}
@@ -0,0 +1,45 @@
+"""Tests for JSON compatibility helpers."""
+
+import json
+from unittest.mock import patch
+
+import pytest
+
+from claude_code_telegram import json_compat
+
+
+class TestJsonCompat:
+    """Tests for json_compat helpers."""
+
+    def test_loads_bytes_and_str(self) -> None:
+        """Test that loads accepts both bytes and str."""
+        assert json_compat.loads(b'{"a": 1}') == {"a": 1}
+        assert json_compat.loads('{"a": 1}') == {"a": 1}
+
+    def test_loads_invalid_raises_json_decode_error(self) -> None:
+        """Test that invalid input raises json.JSONDecodeError."""
+        with pytest.raises(json.JSONDecodeError):
+            json_compat.loads(b"invalid json {{{")
+
+    def test_dumps_round_trip(self) -> None:
+        """Test that dumps produces JSON bytes that parse back."""
+        data = {"tools": ["Bash", "Edit"], "emoji": "✅"}
+        assert json.loads(json_compat.dumps(data)) == data
+        assert json.loads(json_compat.dumps(data, indent=True)) == data
+        assert b"\n  " in json_compat.dumps(data, indent=True)
+
+    def test_dumps_sort_keys(self) -> None:
+        """Test that sort_keys gives the same output regardless of key order."""
+        assert json_compat.dumps({"b": 1, "a": 2}, sort_keys=True) == b'{"a":2,"b":1}'
+        assert json_compat.dumps({"b": 1, "a": 2}, indent=True, sort_keys=True).startswith(
+            b'{\n  "a"'
+        )
+
+    def test_stdlib_fallback(self) -> None:
+        """Test that the stdlib json module is used when orjson is missing."""
+        with patch.object(json_compat, "orjson", None):
+            assert json_compat.loads(b'{"a": 1}') == {"a": 1}
+            assert json_compat.dumps({"a": [1]}) == b'{"a":[1]}'
+            assert json_compat.dumps({"b": 1, "a": 2}, sort_keys=True) == b'{"a":2,"b":1}'
+            with pytest.raises(json.JSONDecodeError):
+                json_compat.loads("")
@@ -1,10 +1,39 @@
 """Tests for stop handler module."""
 
+import io
 import json
 import tempfile
+from collections.abc import Iterator
 from pathlib import Path
+from unittest.mock import patch
 
-from claude_code_telegram.stop_handler import StopEvent
+import httpx
+import pytest
+
+from claude_code_telegram import stop_handler
+from claude_code_telegram.config import Config
+from claude_code_telegram.stop_handler import (
+    TAIL_BLOCK_SIZE,
+    StopEvent,
+    StopNotifier,
+    async_main,
+)
+
+# Transcript with a user entry followed by two assistant entries
+_VALID_TRANSCRIPT_BYTES = b"".join(
+    json.dumps(entry).encode() + b"\n"
+    for entry in [
+        {"type": "user", "message": {"content": [{"type": "text", "text": "Hello"}]}},
+        {
+            "type": "assistant",
+            "message": {"content": [{"type": "text", "text": "First response"}]},
+        },
+        {
+            "type": "assistant",
+            "message": {"content": [{"type": "text", "text": "Final response"}]},
+        },
+    ]
+)
 
 
 class TestStopEvent:
@@ -38,6 +67,12 @@ class TestStopEvent:
         event = StopEvent.from_hook_input(data)
         assert event.stop_hook_active is True
 
+    def test_project_name(self) -> None:
+        """Test extracting the project name from cwd."""
+        event = StopEvent.from_hook_input({"cwd": "/home/user/project/"})
+        assert event.project_name == "project"
+        assert StopEvent.from_hook_input({}).project_name == ""
+
     def test_get_last_assistant_message_no_path(self) -> None:
         """Test get_last_assistant_message with no transcript path."""
         event = StopEvent(
@@ -60,20 +95,96 @@ class TestStopEvent:
 
     def test_get_last_assistant_message_valid_transcript(self) -> None:
         """Test get_last_assistant_message with valid transcript."""
+        with tempfile.NamedTemporaryFile(suffix=".jsonl", delete=False) as f:
+            f.write(_VALID_TRANSCRIPT_BYTES)
+            transcript_path = f.name
+
+        try:
+            event = StopEvent(
+                session_id="abc",
+                transcript_path=transcript_path,
+                cwd="/home",
+                stop_hook_active=False,
+            )
+            last_message = event.get_last_assistant_message()
+            assert last_message == "Final response"
+        finally:
+            Path(transcript_path).unlink()
+
+    def test_get_last_assistant_message_last_text_block(self) -> None:
+        """Test that the last text block of a multi-block entry is returned."""
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".jsonl", delete=False) as f:
+            f.write(json.dumps({
+                "type": "assistant",
+                "message": {"content": [
+                    {"type": "text", "text": "Planning"},
+                    {"type": "tool_use", "name": "Bash"},
+                    {"type": "text", "text": "Summary"},
+                    {"type": "tool_use", "name": "Edit"},
+                ]}
+            }) + "\n")
+            transcript_path = f.name
+
+        try:
+            event = StopEvent(
+                session_id="abc",
+                transcript_path=transcript_path,
+                cwd="/home",
+                stop_hook_active=False,
+            )
+            assert event.get_last_assistant_message() == "Summary"
+        finally:
+            Path(transcript_path).unlink()
+
+    def test_get_last_assistant_message_max_chars(self) -> None:
+        """Test that max_chars truncates the returned message."""
+        with tempfile.NamedTemporaryFile(suffix=".jsonl", delete=False) as f:
+            f.write(_VALID_TRANSCRIPT_BYTES)
+            transcript_path = f.name
+
+        try:
+            event = StopEvent(
+                session_id="abc",
+                transcript_path=transcript_path,
+                cwd="/home",
+                stop_hook_active=False,
+            )
+            assert event.get_last_assistant_message(max_chars=5) == "Final"
+        finally:
+            Path(transcript_path).unlink()
+
+    def test_get_last_assistant_message_no_assistant_entries(self) -> None:
+        """Test get_last_assistant_message with no assistant messages."""
         with tempfile.NamedTemporaryFile(mode="w", suffix=".jsonl", delete=False) as f:
-            # Write some transcript entries
             f.write(json.dumps({
                 "type": "user",
                 "message": {"content": [{"type": "text", "text": "Hello"}]}
             }) + "\n")
+            transcript_path = f.name
+
+        try:
+            event = StopEvent(
+                session_id="abc",
+                transcript_path=transcript_path,
+                cwd="/home",
+                stop_hook_active=False,
+            )
+            assert event.get_last_assistant_message() is None
+        finally:
+            Path(transcript_path).unlink()
+
+    def test_get_last_assistant_message_skips_entries_without_text(self) -> None:
+        """Test that trailing assistant entries without text blocks are skipped."""
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".jsonl", delete=False) as f:
             f.write(json.dumps({
                 "type": "assistant",
-                "message": {"content": [{"type": "text", "text": "First response"}]}
+                "message": {"content": [{"type": "text", "text": "Done"}]}
             }) + "\n")
             f.write(json.dumps({
                 "type": "assistant",
-                "message": {"content": [{"type": "text", "text": "Final response"}]}
+                "message": {"content": [{"type": "tool_use", "name": "Bash"}]}
             }) + "\n")
+            f.write(json.dumps({"type": "user", "message": {"content": []}}) + "\n")
             transcript_path = f.name
 
         try:
@@ -83,18 +194,39 @@ class TestStopEvent:
                 cwd="/home",
                 stop_hook_active=False,
             )
-            last_message = event.get_last_assistant_message()
-            assert last_message == "Final response"
+            assert event.get_last_assistant_message() == "Done"
         finally:
             Path(transcript_path).unlink()
 
-    def test_get_last_assistant_message_no_assistant_entries(self) -> None:
-        """Test get_last_assistant_message with no assistant messages."""
+    def test_get_last_assistant_message_spans_multiple_blocks(self) -> None:
+        """Test transcripts larger than one read block, including long lines."""
+        long_text = "x" * (TAIL_BLOCK_SIZE * 2)
         with tempfile.NamedTemporaryFile(mode="w", suffix=".jsonl", delete=False) as f:
             f.write(json.dumps({
-                "type": "user",
-                "message": {"content": [{"type": "text", "text": "Hello"}]}
+                "type": "assistant",
+                "message": {"content": [{"type": "text", "text": long_text}]}
             }) + "\n")
+            for _ in range(200):
+                f.write(json.dumps({
+                    "type": "user",
+                    "message": {"content": [{"type": "text", "text": "y" * 1000}]}
+                }) + "\n")
+            transcript_path = f.name
+
+        try:
+            event = StopEvent(
+                session_id="abc",
+                transcript_path=transcript_path,
+                cwd="/home",
+                stop_hook_active=False,
+            )
+            assert event.get_last_assistant_message() == long_text
+        finally:
+            Path(transcript_path).unlink()
+
+    def test_get_last_assistant_message_empty_file(self) -> None:
+        """Test get_last_assistant_message with an empty transcript."""
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".jsonl", delete=False) as f:
             transcript_path = f.name
 
         try:
@@ -107,3 +239,160 @@ class TestStopEvent:
             assert event.get_last_assistant_message() is None
         finally:
             Path(transcript_path).unlink()
+
+    def test_get_last_assistant_message_not_jsonl(self) -> None:
+        """Test that a non-JSONL file is skipped without scanning it."""
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".jsonl", delete=False) as f:
+            f.write("plain text header\n")
+            f.write(json.dumps({
+                "type": "assistant",
+                "message": {"content": [{"type": "text", "text": "Ignored"}]}
+            }) + "\n")
+            transcript_path = f.name
+
+        try:
+            event = StopEvent(
+                session_id="abc",
+                transcript_path=transcript_path,
+                cwd="/home",
+                stop_hook_active=False,
+            )
+            assert event.get_last_assistant_message() is None
+        finally:
+            Path(transcript_path).unlink()
+
+    def test_get_last_assistant_message_after_snapshot_header(self) -> None:
+        """Test that a leading file-history-snapshot entry doesn't hide later messages."""
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".jsonl", delete=False) as f:
+            f.write(json.dumps({"type": "file-history-snapshot", "snapshot": {}}) + "\n")
+            f.write(json.dumps({
+                "type": "assistant",
+                "message": {"content": [{"type": "text", "text": "Final response"}]}
+            }) + "\n")
+            transcript_path = f.name
+
+        try:
+            event = StopEvent(
+                session_id="abc",
+                transcript_path=transcript_path,
+                cwd="/home",
+                stop_hook_active=False,
+            )
+            assert event.get_last_assistant_message() == "Final response"
+        finally:
+            Path(transcript_path).unlink()
+
+
+class TestStopNotifier:
+    """Tests for StopNotifier class."""
+
+    @pytest.fixture
+    def sent(self) -> Iterator[list[httpx.Request]]:
+        """Route the shared HTTP client to a mock transport and record requests."""
+        requests: list[httpx.Request] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(200, json={"ok": True, "result": {}})
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        with patch.object(stop_handler, "_client", client):
+            yield requests
+
+    @pytest.fixture
+    def config(self) -> Config:
+        """Create a test configuration."""
+        return Config(telegram_bot_token="TOKEN", telegram_chat_id="123", hostname="host")
+
+    async def test_send_notification(self, sent: list[httpx.Request], config: Config) -> None:
+        """Test that the notification is posted to the Bot API sendMessage method."""
+        event = StopEvent(
+            session_id="abc",
+            transcript_path="",
+            cwd="/home/user/project",
+            stop_hook_active=False,
+        )
+        await StopNotifier(config).send_notification(event)
+
+        assert len(sent) == 1
+        assert str(sent[0].url) == "https://api.telegram.org/botTOKEN/sendMessage"
+        payload = json.loads(sent[0].content)
+        assert payload["chat_id"] == "123"
+        assert payload["parse_mode"] == "HTML"
+        assert "Job Completed" in payload["text"]
+        assert "<code>host</code>" in payload["text"]
+        assert "<code>project</code>" in payload["text"]
+
+    async def test_send_notification_truncates_summary(
+        self, sent: list[httpx.Request], config: Config
+    ) -> None:
+        """Test that long assistant messages are truncated in the summary."""
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".jsonl", delete=False) as f:
+            f.write(json.dumps({
+                "type": "assistant",
+                "message": {"content": [{"type": "text", "text": "a" * 500}]}
+            }) + "\n")
+            transcript_path = f.name
+
+        try:
+            event = StopEvent(
+                session_id="abc",
+                transcript_path=transcript_path,
+                cwd="/home/user/project",
+                stop_hook_active=False,
+            )
+            await StopNotifier(config).send_notification(event)
+        finally:
+            Path(transcript_path).unlink()
+
+        text = json.loads(sent[0].content)["text"]
+        assert text.endswith("\n" + "a" * 300 + "...")
+
+    async def test_send_notification_escapes_summary(
+        self, sent: list[httpx.Request], config: Config
+    ) -> None:
+        """Test that markup in the assistant message is sent as plain text."""
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".jsonl", delete=False) as f:
+            f.write(json.dumps({
+                "type": "assistant",
+                "message": {"content": [{"type": "text", "text": "Use <b> & `x`"}]}
+            }) + "\n")
+            transcript_path = f.name
+
+        try:
+            event = StopEvent(
+                session_id="abc",
+                transcript_path=transcript_path,
+                cwd="/home/user/project",
+                stop_hook_active=False,
+            )
+            await StopNotifier(config).send_notification(event)
+        finally:
+            Path(transcript_path).unlink()
+
+        text = json.loads(sent[0].content)["text"]
+        assert text.endswith("\nUse &lt;b&gt; &amp; `x`")
+
+    async def test_send_notification_skips_stop_hook_active(
+        self, sent: list[httpx.Request], config: Config
+    ) -> None:
+        """Test that no request is made for stop-hook continuations."""
+        event = StopEvent(
+            session_id="abc",
+            transcript_path="",
+            cwd="/home/user/project",
+            stop_hook_active=True,
+        )
+        await StopNotifier(config).send_notification(event)
+        assert sent == []
+
+
+class TestAsyncMain:
+    """Tests for the stop hook entry point."""
+
+    async def test_stop_hook_active_skips_config(self) -> None:
+        """Test that stop-hook continuations return before loading config."""
+        stdin = io.StringIO(json.dumps({"stop_hook_active": True}))
+        with patch("sys.stdin", stdin), patch.object(Config, "load") as load:
+            await async_main()
+        load.assert_not_called()